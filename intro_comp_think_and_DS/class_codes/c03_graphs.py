@@ -1,7 +1,18 @@
+import collections, random, time
+
 def main():
     # testSP('Chicago', 'Boston')
     testSP('Boston', 'Phoenix')
 
+    # Time the construction of large random road graphs
+    # timeBuild((10000, 100000, 300000), 4)
+
+    # Compare BFS with dequeBFS on large random road graphs
+    # timeBFS((25000, 100000, 250000), 4)
+
+    # Reachability on an undirected graph (no search needed)
+    # testConnected('Boston', 'Phoenix')
+
 
 class Node(object):
     def __init__(self, name):
@@ -27,14 +38,18 @@ class Edge(object):
 
 
 class Digraph(object):
-    """edges is a dict mapping each node to a list of its children"""
+    """edges is a dict mapping each node to a list of its children,
+       names is a dict mapping each name to its node (for getNode)"""
     def __init__(self):
         self.edges = {}
+        self.names = {}
     def addNode(self, node):
         if node in self.edges:
             raise ValueError('Duplicate node')
         else:
             self.edges[node] = []
+            # If two nodes share a name, getNode finds the first one
+            self.names.setdefault(node.getName(), node)
     def addEdge(self, edge):
         src = edge.getSource()
         dest = edge.getDestination()
@@ -45,11 +60,15 @@ class Digraph(object):
         return self.edges[node]
     def hasNode(self, node):
         return node in self.edges
+    def mayReach(self, start, end):
+        """Returns False only if there is surely no path from start to end
+           (a Digraph does not know, so it always says True)"""
+        return True
     def getNode(self, name):
-        for n in self.edges:
-            if n.getName() == name:
-                return n
-        raise NameError(name)
+        try:
+            return self.names[name]
+        except KeyError:
+            raise NameError(name)
     def __str__(self):
         result = ''
         for src in self.edges:
@@ -66,6 +85,86 @@ class Graph(Digraph):
         Digraph.addEdge(self, rev)
 
 
+class Neighbors(object):
+    """Read-only view of the nodes joined to node by the edges in
+       incident (iterating over it gives the other end of each edge)"""
+    def __init__(self, node, incident):
+        self.node = node
+        self.incident = incident
+    def __iter__(self):
+        for edge in self.incident:
+            if edge.getSource() is self.node:
+                yield edge.getDestination()
+            else:
+                yield edge.getSource()
+    def __len__(self):
+        return len(self.incident)
+    def __contains__(self, other):
+        for node in self:
+            if node is other:
+                return True
+        return False
+
+
+class UndirectedGraph(Digraph):
+    """Undirected graph storing each edge once: edgeList holds every
+       Edge, and edges maps each node to the list of Edges touching it
+       (the same Edge object is in both lists), seen through childrenOf
+       as a Neighbors view.
+       parent and size are a union-find index of connected components,
+       updated by addNode and addEdge, so mayReach answers whether two
+       nodes are connected without searching"""
+    def __init__(self):
+        Digraph.__init__(self)
+        self.edgeList = []
+        self.parent = {}
+        self.size = {}
+    def addNode(self, node):
+        Digraph.addNode(self, node)
+        self.parent[node] = node
+        self.size[node] = 1
+    def addEdge(self, edge):
+        src = edge.getSource()
+        dest = edge.getDestination()
+        if not (src in self.edges and dest in self.edges):
+            raise ValueError('Node not in graph')
+        self.edgeList.append(edge)
+        self.edges[src].append(edge)
+        if dest is not src:
+            self.edges[dest].append(edge)
+        self.union(src, dest)
+    def childrenOf(self, node):
+        return Neighbors(node, self.edges[node])
+    def find(self, node):
+        """Returns the representative node of node's component"""
+        parent = self.parent
+        while parent[node] is not node:
+            # Path halving: point node to its grandparent as we go up
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+    def union(self, node1, node2):
+        """Merges the components of node1 and node2 (the smaller one
+           goes under the larger one)"""
+        root1 = self.find(node1)
+        root2 = self.find(node2)
+        if root1 is root2:
+            return
+        if self.size[root1] < self.size[root2]:
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.size[root1] += self.size[root2]
+    def connected(self, node1, node2):
+        return self.find(node1) is self.find(node2)
+    def mayReach(self, start, end):
+        return self.connected(start, end)
+    def __str__(self):
+        result = ''
+        for edge in self.edgeList:
+            result = result + str(edge) + '\n'
+        return result[:-1] #omit final newline
+
+
 def buildCityGraph(graphType):
     g = graphType()
 
@@ -86,6 +185,43 @@ def buildCityGraph(graphType):
     return g
 
 
+def buildGraphFromEdges(graphType, edgeList, names = ()):
+    """Assumes graphType is Digraph or Graph, edgeList is a list of
+          (source name, destination name) pairs and names is a list of
+          city names
+       Returns a graph with a node for each name in names, then for each
+          new name in edgeList (in order of appearance), and the edges
+          of edgeList"""
+    g = graphType()
+    for name in names:
+        g.addNode(Node(name))
+    for srcName, destName in edgeList:
+        # Create the nodes the first time their names appear
+        for name in (srcName, destName):
+            if name not in g.names:
+                g.addNode(Node(name))
+        g.addEdge(Edge(g.names[srcName], g.names[destName]))
+    return g
+
+
+def timeBuild(numCitiesList, roadsPerCity, graphType = Digraph):
+    """Assumes numCitiesList is a list of ints > 1 and roadsPerCity an int
+       Prints how long it takes to build random road graphs (with
+          roadsPerCity roads leaving each city) of each size"""
+    for numCities in numCitiesList:
+        names = ['City ' + str(i) for i in range(numCities)]
+        edgeList = [(names[i], random.choice(names))
+                    for i in range(numCities) for j in range(roadsPerCity)]
+        start = time.perf_counter()
+        g = buildGraphFromEdges(graphType, edgeList, names)
+        # Look every city up by name, as buildCityGraph does
+        for srcName, destName in edgeList:
+            g.getNode(srcName)
+            g.getNode(destName)
+        print(numCities, 'cities,', len(edgeList), 'roads:',
+              round(time.perf_counter() - start, 3), 's')
+
+
 def printPath(path):
     """Assumes path is a list of nodes"""
     result = ''
@@ -121,6 +257,75 @@ def shortestPath(graph, start, end, toPrint = False):
        Returns a shortest path from start to end in graph"""
     return DFS(graph, start, end, [], None, toPrint)
 
+def stackDFS(graph, start, end, toPrint = False, printPaths = True):
+    """Assumes graph is a Digraph; start and end are nodes
+       Returns the same shortest path from start to end as DFS, without
+          recursion (an explicit stack of children iterators) and without
+          copying the path at every step. bestDepth keeps the smallest
+          depth each node was reached at: reaching it deeper cannot lead
+          to a shorter path (equal depths are still explored, because DFS
+          keeps the last shortest path it finds). onPath marks the nodes
+          of the current path, one byte per node.
+       If printPaths is False, toPrint only prints the depth and node of
+          each step instead of building the whole path string"""
+    # Do not search if the graph knows there is no path
+    if not graph.mayReach(start, end):
+        return None
+
+    # Number the nodes to index the tables
+    index = {}
+    for node in graph.edges:
+        index[node] = len(index)
+    onPath = bytearray(len(index))
+    bestDepth = [len(index) + 1] * len(index)
+
+    def printStep(path):
+        if printPaths:
+            print('Current DFS path:', printPath(path))
+        else:
+            print('Current DFS depth:', len(path), 'at', path[-1])
+
+    path = [start]
+    if toPrint:
+        printStep(path)
+    if start == end:
+        return path
+    onPath[index[start]] = 1
+    bestDepth[index[start]] = 1
+    stack = [iter(graph.childrenOf(start))]
+    shortest = None
+    while stack:
+        node = next(stack[-1], None)
+        if node == None:
+            # Every child done: back up one node
+            stack.pop()
+            onPath[index[path.pop()]] = 0
+            continue
+        i = index[node]
+        # Avoid cycles
+        if onPath[i]:
+            if toPrint:
+                print('Already visited', node)
+            continue
+        # Only go on if the path can still get shorter (same test as DFS)
+        if shortest != None and len(path) >= len(shortest):
+            continue
+        depth = len(path) + 1
+        if depth > bestDepth[i]:
+            continue
+        bestDepth[i] = depth
+
+        path.append(node)
+        if toPrint:
+            printStep(path)
+        if node == end:
+            shortest = path[:]
+            path.pop()
+        else:
+            onPath[i] = 1
+            stack.append(iter(graph.childrenOf(node)))
+    return shortest
+
 def testSP(source, destination):
     g = buildCityGraph(Digraph)
     sp = shortestPath(g, g.getNode(source), g.getNode(destination),
@@ -132,6 +337,16 @@ def testSP(source, destination):
         print('There is no path from', source, 'to', destination)
 
 
+def testConnected(source, destination):
+    g = buildCityGraph(UndirectedGraph)
+    g.addNode(Node('Honolulu'))
+    for name in (destination, 'Honolulu'):
+        if g.connected(g.getNode(source), g.getNode(name)):
+            print(source, 'and', name, 'are connected')
+        else:
+            print(source, 'and', name, 'are not connected')
+
+
 def BFS(graph, start, end, printQueue=True , toPrint=False):
     """Assumes graph is a Digraph; start and end are nodes
        Returns a shortest path from start to end in graph"""
@@ -156,10 +371,62 @@ def BFS(graph, start, end, printQueue=True , toPrint=False):
                 pathQueue.append(newPath)
     return None
 
+def dequeBFS(graph, start, end):
+    """Assumes graph is a Digraph; start and end are nodes
+       Returns the same shortest path from start to end as BFS, but
+          keeps one parent per node instead of a copy of every path"""
+    # Do not search if the graph knows there is no path
+    if not graph.mayReach(start, end):
+        return None
+    # parents maps each node reached to the node it was reached from
+    # (it doubles as the visited set)
+    parents = {start: None}
+    nodeQueue = collections.deque([start])
+    while nodeQueue:
+        lastNode = nodeQueue.popleft()
+        if lastNode == end:
+            # Follow the parents back to start
+            path = []
+            while lastNode != None:
+                path.append(lastNode)
+                lastNode = parents[lastNode]
+            path.reverse()
+            return path
+        for nextNode in graph.childrenOf(lastNode):
+            # The first time a node is reached is along a shortest path
+            if nextNode not in parents:
+                parents[nextNode] = lastNode
+                nodeQueue.append(nextNode)
+    return None
+
 def shortestPath(graph, start, end, printQueue=True , toPrint=False):
     """Assumes graph is a Digraph; start and end are nodes
        Returns a shortest path from start to end in graph"""
+    if not (printQueue or toPrint):
+        return dequeBFS(graph, start, end)
     return BFS(graph, start, end, printQueue, toPrint)
+
+def timeBFS(numCitiesList, roadsPerCity, maxEdgesBFS = 400000):
+    """Assumes numCitiesList is a list of ints > 1 and roadsPerCity an int
+       Prints how long BFS (only on graphs of at most maxEdgesBFS roads,
+          it grows too fast) and dequeBFS take to find a path between
+          two random cities of random road graphs of each size"""
+    for numCities in numCitiesList:
+        names = ['City ' + str(i) for i in range(numCities)]
+        edgeList = [(names[i], random.choice(names))
+                    for i in range(numCities) for j in range(roadsPerCity)]
+        g = buildGraphFromEdges(Digraph, edgeList, names)
+        start, end = g.getNode(names[0]), g.getNode(random.choice(names))
+        print(numCities, 'cities,', len(edgeList), 'roads')
+        if len(edgeList) <= maxEdgesBFS:
+            t = time.perf_counter()
+            path = BFS(g, start, end, printQueue = False)
+            print('    BFS:', len(path) if path else None, 'nodes,',
+                  round(time.perf_counter() - t, 3), 's')
+        t = time.perf_counter()
+        path = dequeBFS(g, start, end)
+        print('    dequeBFS:', len(path) if path else None, 'nodes,',
+              round(time.perf_counter() - t, 3), 's')
     
 
 # Run 'main' function
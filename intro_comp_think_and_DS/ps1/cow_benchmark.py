@@ -0,0 +1,193 @@
+# Benchmark suite for the cow transport algorithms in ps1a.py
+
+import json
+import math
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+from ps1a import TRANSPORT_ALGORITHMS, trip_lower_bound
+
+
+def main():
+    # Benchmark every algorithm and save the results
+    run_benchmarks(output="cow_benchmark.json")
+
+
+# Weight distributions for synthetic herds: functions of (random generator,
+# weight limit) returning one cow weight between 1 and the limit
+DISTRIBUTIONS = {
+    "uniform": lambda rng, limit: rng.randint(1, limit),
+    "light": lambda rng, limit: rng.randint(1, max(1, limit // 3)),
+    "heavy": lambda rng, limit: rng.randint(max(1, limit // 2), limit),
+    "normal": lambda rng, limit: min(limit, max(1, round(rng.gauss(limit / 2, limit / 6)))),
+}
+
+# Largest herd each algorithm is benchmarked on (brute force and the exact
+# search grow too fast to go further)
+MAX_HERD_SIZE = {
+    "Greedy": 20000,
+    "Fast Greedy": 1000000,
+    "Brute Force": 10,
+    "Branch and Bound": 50,
+}
+
+
+def generate_herd(size, distribution="uniform", limit=10, seed=None):
+    """
+    Creates a synthetic herd of cows.
+
+    Parameters:
+    size - number of cows (an int)
+    distribution - name of the weight distribution (a key of DISTRIBUTIONS)
+    limit - weight limit of the spaceship, no cow weighs more (an int)
+    seed - OPTIONAL seed for the random generator, to get the same herd back
+
+    Returns:
+    a dictionary of cow name (string), weight (int) pairs
+    """
+    rng = random.Random(seed)
+    weight = DISTRIBUTIONS[distribution]
+    return {f"Cow {i}": weight(rng, limit) for i in range(size)}
+
+
+def benchmark_solver(solver, cows, limit=10, repeats=5):
+    """
+    Runs a transport algorithm several times on the same herd.
+
+    Parameters:
+    solver - function taking (cows, limit) and returning a list of trips
+    cows - a dictionary of name (string), weight (int) pairs
+    limit - weight limit of the spaceship (an int - Default = 10)
+    repeats - number of timed runs (an int - Default = 5)
+
+    Returns:
+    A dictionary with the median and 95th percentile running time in
+    seconds, the peak memory allocated during one extra (untimed) run in
+    bytes, the number of trips, a lower bound on the number of trips, and
+    their ratio (1.0 means the allocation is certainly optimal)
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        trips = solver(cows, limit)
+        times.append(time.perf_counter() - start)
+
+    # Memory is measured apart: tracing slows allocations down a lot
+    tracemalloc.start()
+    solver(cows, limit)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times.sort()
+    lower_bound = trip_lower_bound(list(cows.values()), limit)
+    return {
+        "median_s": statistics.median(times),
+        "p95_s": times[math.ceil(0.95 * len(times)) - 1],
+        "peak_memory_bytes": peak_memory,
+        "trips": len(trips),
+        "lower_bound": lower_bound,
+        "quality": len(trips) / lower_bound if lower_bound else 1.0,
+    }
+
+
+def run_benchmarks(algorithms=None, sizes=(10, 50, 1000, 20000, 1000000),
+                   distributions=("uniform", "normal"), limit=10, repeats=5,
+                   seed=0, output=None):
+    """
+    Benchmarks transport algorithms on synthetic herds of every size and
+    weight distribution, skipping herds larger than MAX_HERD_SIZE allows.
+    Prints one line per run and optionally saves everything as JSON, so
+    results of different versions can be compared (see compare_benchmarks).
+
+    Parameters:
+    algorithms - names (keys of TRANSPORT_ALGORITHMS) of the algorithms to
+                 benchmark (Default = None, all of them)
+    sizes - herd sizes (ints)
+    distributions - names of weight distributions (keys of DISTRIBUTIONS)
+    limit - weight limit of the spaceship (an int - Default = 10)
+    repeats - number of timed runs of each algorithm on each herd
+    seed - seed for the herds, so every version sees the same ones
+    output - OPTIONAL name of the JSON file to write
+
+    Returns:
+    A dictionary with the settings and a list of results, one per
+    (algorithm, size, distribution)
+    """
+    if algorithms is None:
+        algorithms = list(TRANSPORT_ALGORITHMS)
+
+    report = {
+        "python": platform.python_version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "limit": limit,
+        "repeats": repeats,
+        "seed": seed,
+        "results": [],
+    }
+
+    for distribution in distributions:
+        for size in sizes:
+            cows = generate_herd(size, distribution, limit, seed)
+            for name in algorithms:
+                if size > MAX_HERD_SIZE.get(name, size):
+                    continue
+
+                result = benchmark_solver(TRANSPORT_ALGORITHMS[name], cows, limit, repeats)
+                result.update(algorithm=name, size=size, distribution=distribution)
+                report["results"].append(result)
+
+                print(f"{name:>16} {distribution:>8} n={size:<8} "
+                      f"median {result['median_s']:.6f} s  p95 {result['p95_s']:.6f} s  "
+                      f"peak {result['peak_memory_bytes'] / 1024:.0f} KiB  "
+                      f"trips {result['trips']} (>= {result['lower_bound']})")
+
+    if output is not None:
+        with open(output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    return report
+
+
+def compare_benchmarks(old_filename, new_filename, tolerance=1.2):
+    """
+    Compares two JSON files written by run_benchmarks and prints the runs
+    that got slower or worse.
+
+    Parameters:
+    old_filename - name of the baseline JSON file
+    new_filename - name of the JSON file to check
+    tolerance - how many times slower the new median may be before it is
+                reported (a float - Default = 1.2)
+
+    Returns:
+    A list of (algorithm, size, distribution, what regressed) tuples
+    """
+    with open(old_filename) as file:
+        old = json.load(file)
+    with open(new_filename) as file:
+        new = json.load(file)
+
+    baseline = {(r["algorithm"], r["size"], r["distribution"]): r for r in old["results"]}
+
+    regressions = []
+    for result in new["results"]:
+        key = (result["algorithm"], result["size"], result["distribution"])
+        if key not in baseline:
+            continue
+        before = baseline[key]
+        if result["median_s"] > tolerance * before["median_s"]:
+            regressions.append(key + (f"median {before['median_s']:.6f} s -> {result['median_s']:.6f} s",))
+        if result["trips"] > before["trips"]:
+            regressions.append(key + (f"trips {before['trips']} -> {result['trips']}",))
+
+    for algorithm, size, distribution, what in regressions:
+        print(f"REGRESSION: {algorithm} {distribution} n={size}: {what}")
+    return regressions
+
+
+# Run 'main' function
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,7 @@
+import time
+import unittest
+
+
 # From codereview.stackexchange.com                    
 def partitions(set_):
     if not set_:
@@ -14,3 +18,158 @@ def partitions(set_):
 def get_partitions(set_):
     for partition in partitions(set_):
         yield [list(elt) for elt in partition]
+
+
+def rgs_partitions(n, block_ok=None, max_blocks=None, prefix=()):
+    """
+    Generates every partition of the positions 0, 1, ..., n-1 exactly once, in
+    the order of their restricted growth strings (position i goes either to
+    one of the blocks already opened by positions 0..i-1 or to a new block).
+
+    Positions are added one at a time, so a block that becomes infeasible is
+    detected as soon as it is built and none of the partitions extending it
+    are generated.
+
+    Parameters:
+    n - number of positions (an int)
+    block_ok - OPTIONAL function called with a block (list of positions, which
+               must not be modified or kept) each time a position is added to
+               it. Returning False discards every partition containing that
+               block (Default = None, keep everything)
+    max_blocks - OPTIONAL maximum number of blocks of the partitions generated
+                 (Default = None, no maximum)
+    prefix - OPTIONAL restricted growth string fixing the blocks of the first
+             positions: only partitions where position i is in block
+             prefix[i] are generated (Default = (), no position fixed)
+
+    Returns:
+    A generator of partitions, each a tuple of blocks, each block a tuple of
+    positions in increasing order
+    """
+    # blocks[b] holds the positions placed in block b so far, label[i] is
+    # the block of position i and choice[i] the next block to try for it
+    blocks = []
+    label = [0] * n
+    choice = [0] * n
+    for i, b in enumerate(prefix):
+        if b == len(blocks):
+            blocks.append([])
+        blocks[b].append(i)
+        label[i] = b
+    if max_blocks is not None and len(blocks) > max_blocks:
+        return
+
+    start = len(prefix)
+    i = start
+    while i >= start:
+        if i == n:
+            # Every position placed: emit the partition and backtrack
+            yield tuple([tuple(block) for block in blocks])
+            i -= 1
+        else:
+            # Blocks available to position i: the open ones, plus a new one
+            # unless that would make too many blocks
+            top = len(blocks)
+            if max_blocks is None or top < max_blocks:
+                top += 1
+
+            b = choice[i]
+            if b < top:
+                # Place position i in block b (a new block if b == len(blocks))
+                choice[i] = b + 1
+                if b == len(blocks):
+                    blocks.append([i])
+                else:
+                    blocks[b].append(i)
+
+                if block_ok is None or block_ok(blocks[b]):
+                    label[i] = b
+                    i += 1
+                    continue
+
+                # Infeasible block: undo and try the next block for i
+                blocks[b].pop()
+                if not blocks[b]:
+                    blocks.pop()
+                continue
+
+            # Every block tried for position i: reset it and backtrack
+            choice[i] = 0
+            i -= 1
+
+        # Take back the previous position before trying its next block
+        if i >= start:
+            b = label[i]
+            blocks[b].pop()
+            if not blocks[b]:
+                blocks.pop()
+
+
+def benchmark_partitions(sizes=range(8, 15), time_budget=1.0):
+    """
+    Measures how many partitions per second get_partitions and rgs_partitions
+    produce for n items, for each n in 'sizes'. Each generator runs for at most
+    'time_budget' seconds per size (Bell numbers grow too fast to enumerate
+    everything for n = 14). Prints a table with the results.
+
+    Parameters:
+    sizes - iterable of numbers of items (ints)
+    time_budget - maximum number of seconds spent on each generator and size
+
+    Returns:
+    A list of (n, get_partitions rate, rgs_partitions rate) tuples, rates in
+    partitions per second
+    """
+    results = []
+    print(f"{'n':>3} {'get_partitions':>16} {'rgs_partitions':>16}")
+    for n in sizes:
+        rates = []
+        for generator in (get_partitions(list(range(n))), rgs_partitions(n)):
+            count = 0
+            start = time.perf_counter()
+            deadline = start + time_budget
+            for _ in generator:
+                count += 1
+                # Checking the clock is slow, do it every so often
+                if count % 1024 == 0 and time.perf_counter() > deadline:
+                    break
+            rates.append(count / (time.perf_counter() - start))
+        results.append((n, rates[0], rates[1]))
+        print(f"{n:>3} {rates[0]:>16.0f} {rates[1]:>16.0f}")
+    return results
+
+
+# ================================================================
+# Tests
+# ================================================================
+class TestPartitions(unittest.TestCase):
+    def test_rgs_partitions_counts(self):
+        # Bell numbers
+        for n, bell in enumerate([1, 1, 2, 5, 15, 52, 203, 877]):
+            self.assertEqual(len(list(rgs_partitions(n))), bell)
+
+    def test_rgs_partitions_same_as_get_partitions(self):
+        expected = set()
+        for partition in get_partitions(list(range(5))):
+            expected.add(tuple(sorted(tuple(sorted(block)) for block in partition)))
+        self.assertEqual(set(rgs_partitions(5)), expected)
+
+    def test_rgs_partitions_block_ok(self):
+        weights = [6, 5, 4, 3, 2]
+        ok = lambda block: sum(weights[i] for i in block) <= 10
+        pruned = list(rgs_partitions(len(weights), ok))
+        valid = [p for p in rgs_partitions(len(weights))
+                 if all(ok(list(block)) for block in p)]
+        self.assertEqual(pruned, valid)
+
+    def test_rgs_partitions_max_blocks_and_prefix(self):
+        everything = list(rgs_partitions(6))
+        self.assertEqual(list(rgs_partitions(6, max_blocks=2)),
+                         [p for p in everything if len(p) <= 2])
+        self.assertEqual(list(rgs_partitions(6, prefix=(0, 1, 0))),
+                         [p for p in everything if 1 not in p[0] and 2 in p[0]])
+
+
+# Run benchmark
+if __name__ == "__main__":
+    benchmark_partitions()
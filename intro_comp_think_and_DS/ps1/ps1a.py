@@ -1,9 +1,14 @@
-from ps1_partition import get_partitions
+from ps1_partition import get_partitions, rgs_partitions
+from array import array
+import multiprocessing
+import os
+import tempfile
 import time
+import unittest
 
 def main():
-    # Compare greedy vs. brute force optimization
-    compare_cow_transport_algorithms()
+    # Compare greedy vs. brute force optimization (and brute force on 4 processes)
+    compare_cow_transport_algorithms(workers=4)
 
 
 #================================
@@ -36,6 +41,106 @@ def load_cows(filename):
     return cows_dict
 
 
+def iter_cow_records(filename, errors=None, chunk_size=1 << 20):
+    """
+    Streams the < cow name, weight > pairs of the given file without loading
+    it whole: lines are read in chunks of about 'chunk_size' bytes. Malformed
+    lines (no comma, empty name, weight that is not a positive int) are
+    reported and skipped instead of stopping the load. Blank lines are ignored.
+
+    Parameters:
+    filename - the name of the data file as a string
+    errors - OPTIONAL list to which a (line number, line, reason) tuple is
+             appended for each malformed line. If None, they are printed
+    chunk_size - approximate number of bytes read at once (an int)
+
+    Returns:
+    A generator of (line number, cow name, weight) tuples, line numbers
+    starting at 1
+    """
+    line_number = 0
+    with open(filename, "r") as file:
+        while True:
+            lines = file.readlines(chunk_size)
+            if not lines:
+                break
+
+            for line in lines:
+                line_number += 1
+                line = line.strip()
+                if not line:
+                    continue
+
+                # The weight is whatever follows the last comma
+                name, comma, raw_weight = line.rpartition(",")
+                try:
+                    weight = int(raw_weight)
+                except ValueError:
+                    weight = None
+
+                reason = None
+                if not comma:
+                    reason = "missing comma"
+                elif not name or name.isspace():
+                    reason = "missing cow name"
+                elif weight is None:
+                    reason = f"weight {raw_weight.strip()!r} is not an int"
+                elif not 0 < weight < 2**31:
+                    reason = f"weight {weight} out of range"
+
+                if reason is None:
+                    yield line_number, name.strip(), weight
+                elif errors is None:
+                    print(f"Skipping line {line_number} of {filename}: {reason}")
+                else:
+                    errors.append((line_number, line, reason))
+
+
+def load_cow_arrays(filename, duplicates="last", errors=None, chunk_size=1 << 20):
+    """
+    Streaming version of load_cows for large manifests (see iter_cow_records).
+    Instead of a dictionary, returns compact parallel arrays that the
+    index-based solvers (e.g. branch_and_bound_trip_indices) take directly.
+
+    Parameters:
+    filename - the name of the data file as a string
+    duplicates - what to do when a cow name appears more than once:
+                 "last" keeps the last weight (like load_cows), "first" keeps
+                 the first one, "keep" keeps every entry, "error" raises a
+                 ValueError (Default = "last")
+    errors - OPTIONAL list collecting (line number, line, reason) tuples for
+             malformed lines. If None, they are printed
+    chunk_size - approximate number of bytes read at once (an int)
+
+    Returns:
+    A tuple (names, weights): a list of cow names and an array('i') with the
+    weight of names[i] at position i, in order of first appearance
+    """
+    if duplicates not in ("last", "first", "keep", "error"):
+        raise ValueError(f"Unknown duplicates policy: {duplicates}")
+
+    names = []
+    weights = array("i")
+
+    # Position of each name (not needed when every entry is kept)
+    seen = {}
+
+    for line_number, name, weight in iter_cow_records(filename, errors, chunk_size):
+        if duplicates != "keep":
+            index = seen.setdefault(name, len(names))
+            if index != len(names):
+                if duplicates == "last":
+                    weights[index] = weight
+                elif duplicates == "error":
+                    raise ValueError(f"Duplicate cow {name!r} on line {line_number}")
+                continue
+
+        names.append(name)
+        weights.append(weight)
+
+    return names, weights
+
+
 # Problem 2
 def greedy_cow_transport(cows,limit=10):
     """
@@ -93,8 +198,124 @@ def greedy_cow_transport(cows,limit=10):
     return trips
 
 
+# Problem 2 (extension): same greedy allocation for very large herds
+def fast_greedy_cow_transport(cows,limit=10):
+    """
+    Same allocation as greedy_cow_transport (trips and cows in the same
+    order), computed in O(n log n) instead of rescanning the herd for every
+    trip. Filling trips one by one with the largest cow that fits is the same
+    as sending each cow, from heaviest to lightest, on the first trip that
+    has room for it (first-fit decreasing), which is what this function does.
+
+    Does not mutate the given dictionary of cows.
+
+    Parameters:
+    cows - a dictionary of name (string), weight (int) pairs
+    limit - weight limit of the spaceship (an int - Default = 10)
+
+    Returns:
+    A list of lists, with each inner list containing the names of cows
+    transported on a particular trip and the overall list containing all the
+    trips
+
+    Raises:
+    ValueError if a cow weighs more than the limit (it cannot fly at all)
+    """
+    names = list(cows)
+    weights = [cows[name] for name in names]
+
+    # Solve on indices and map them back to cow names
+    trips = first_fit_decreasing_trip_indices(weights, limit)
+    return [[names[i] for i in trip] for trip in trips]
+
+
+def first_fit_decreasing_trip_indices(weights, limit):
+    """
+    Core of fast_greedy_cow_transport, working on positions instead of cow
+    names.
+
+    The trips with room for a cow are found with a segment tree holding the
+    largest space left over ranges of trips. Cows of equal weight are placed
+    in one sweep over the tree, each trip taking as many of them as fit, and
+    trips opened for the cows left over are opened in bulk.
+
+    Parameters:
+    weights - a sequence of cow weights (ints)
+    limit - weight limit of the spaceship (an int)
+
+    Returns:
+    A list of lists, each inner list holding the positions (in 'weights') of
+    the cows transported on one trip, heaviest cow first (equal weights in
+    their original order)
+    """
+    if weights and max(weights) > limit:
+        raise ValueError(f"A cow weighing {max(weights)} exceeds the limit {limit}")
+
+    # Group positions by weight, keeping their original order
+    groups = {}
+    for i, weight in enumerate(weights):
+        groups.setdefault(weight, []).append(i)
+
+    # Segment tree over the trips (at most one per cow): leaves hold the
+    # space left in each trip, inner nodes the largest space left below them.
+    # Node 1 is the root and node k has children 2k and 2k+1. Trips that are
+    # not open yet are empty, so they have 'limit' space left
+    size = 1
+    while size < max(len(weights), 1):
+        size *= 2
+    space = [limit] * (2 * size)
+
+    trips = []
+
+    def sweep(node, start, span, weight, group, placed):
+        # Puts cows group[placed:] in the open trips below 'node' (trips
+        # start..start+span-1) that have room for them, left to right, and
+        # returns how many cows of the group are placed once done
+        if span == 1:
+            count = min(len(group) - placed, space[node] // weight)
+            trips[start].extend(group[placed:placed + count])
+            space[node] -= count * weight
+            return placed + count
+        half = span // 2
+        left = 2 * node
+        if space[left] >= weight:
+            placed = sweep(left, start, half, weight, group, placed)
+        if placed < len(group) and start + half < len(trips) and space[left + 1] >= weight:
+            placed = sweep(left + 1, start + half, half, weight, group, placed)
+        space[node] = max(space[left], space[left + 1])
+        return placed
+
+    for weight in sorted(groups, reverse=True):
+        group = groups[weight]
+
+        # First fit for a run of equal weights: fill the open trips with
+        # room, in order. Subtrees without room are never entered
+        placed = 0
+        if trips and space[1] >= weight:
+            placed = sweep(1, 0, size, weight, group, 0)
+
+        # Cows left over need new trips, each taking as many as fit
+        if placed < len(group):
+            per_trip = limit // weight
+            first = len(trips)
+            trips.extend(group[p:p + per_trip] for p in range(placed, len(group), per_trip))
+            space[size + first:size + len(trips)] = [limit - per_trip * weight] * (len(trips) - first)
+            space[size + len(trips) - 1] = limit - len(trips[-1]) * weight
+
+            # Update the nodes above the new trips, one level at a time
+            low = (size + first) // 2
+            high = (size + len(trips) - 1) // 2
+            while low:
+                space[low:high + 1] = map(max, space[2 * low:2 * high + 2:2],
+                                          space[2 * low + 1:2 * high + 2:2])
+                low //= 2
+                high //= 2
+
+    return trips
+
+
 # Problem 3
-def brute_force_cow_transport(cows,limit=10):
+def brute_force_cow_transport(cows,limit=10,workers=1):
     """
     Finds the allocation of cows that minimizes the number of spaceship trips
     via brute force.  The brute force algorithm should follow the following method:
@@ -109,19 +330,24 @@ def brute_force_cow_transport(cows,limit=10):
     Parameters:
     cows - a dictionary of name (string), weight (int) pairs
     limit - weight limit of the spaceship (an int - Default = 10)
+    workers - number of processes searching in parallel (an int - Default = 1).
+              With more than one, see parallel_brute_force_cow_transport
     
     Returns:
     A list of lists, with each inner list containing the names of cows
     transported on a particular trip and the overall list containing all the
     trips
     """
+    if workers > 1:
+        return parallel_brute_force_cow_transport(cows, limit, workers)
+
     # Make copy of dictionary (to avoid any side-effects). No need to sort
     cows_copy = cows.copy()
 
     # Initialize variabe to count number of trips. The objective is to minimize
     # the number of trips. Initial guess could be any large number. I assumed the
-    # worst case = one cow per trip
-    n_trips = len(cows_copy)
+    # worst case = one cow per trip, plus one so that allocation is also kept
+    n_trips = len(cows_copy) + 1
 
     # Loop through all the possible combinations of trips
     for partition in get_partitions(cows_copy):
@@ -156,50 +382,469 @@ def brute_force_cow_transport(cows,limit=10):
     return trips
 
 
+# Problem 3 (extension): brute force spread over several processes
+def parallel_brute_force_cow_transport(cows,limit=10,workers=2):
+    """
+    Finds the allocation of cows that minimizes the number of spaceship trips
+    by enumerating partitions, like brute_force_cow_transport, but splits the
+    partitions among 'workers' processes.
+
+    The partitions are split into shards by fixing which trip each of the
+    first few (heaviest) cows takes. All processes share the fewest trips
+    found so far and skip partitions with more trips than that, and trips
+    over the weight limit are discarded as soon as they are formed. Each shard
+    reports the first partition (in rgs_partitions order) with its fewest
+    trips, and the first shard reaching the overall fewest wins, so the result
+    does not depend on how the processes were scheduled.
+
+    Does not mutate the given dictionary of cows.
+
+    Parameters:
+    cows - a dictionary of name (string), weight (int) pairs
+    limit - weight limit of the spaceship (an int - Default = 10)
+    workers - number of processes (an int - Default = 2)
+
+    Returns:
+    A list of lists, with each inner list containing the names of cows
+    transported on a particular trip and the overall list containing all the
+    trips
+
+    Raises:
+    ValueError if a cow weighs more than the limit (it cannot fly at all)
+    """
+    # Heavy cows first: overweight trips show up after fewer cows
+    names = sorted(cows, key=cows.__getitem__, reverse=True)
+    weights = [cows[name] for name in names]
+    if not names:
+        return []
+
+    # The greedy allocation is valid, so the best has at most as many trips
+    incumbent = multiprocessing.Value("i", len(first_fit_decreasing_trip_indices(weights, limit)))
+
+    # Shards: one per valid way of placing the first 'depth' cows, with
+    # enough of them to keep every worker busy
+    block_ok = lambda block: sum(weights[i] for i in block) <= limit
+    depth = 1
+    shards = list(rgs_partitions(depth, block_ok))
+    while depth < len(weights) and len(shards) < 8 * workers:
+        depth += 1
+        shards = list(rgs_partitions(depth, block_ok))
+
+    # Restricted growth string of each shard: the trip of each cow
+    prefixes = []
+    for shard in shards:
+        prefix = [0] * depth
+        for trip, block in enumerate(shard):
+            for i in block:
+                prefix[i] = trip
+        prefixes.append(tuple(prefix))
+
+    with multiprocessing.Pool(workers, _init_brute_force_worker,
+                              (incumbent, weights, limit)) as pool:
+        results = pool.map(_brute_force_shard, prefixes, chunksize=1)
+
+    # Fewest trips, earliest shard on ties
+    best = None
+    for partition in results:
+        if partition is not None and (best is None or len(partition) < len(best)):
+            best = partition
+
+    return [[names[i] for i in trip] for trip in best]
+
+
+# State of each parallel_brute_force_cow_transport worker process
+_worker_incumbent = None
+_worker_weights = None
+_worker_limit = None
+
+def _init_brute_force_worker(incumbent, weights, limit):
+    global _worker_incumbent, _worker_weights, _worker_limit
+    _worker_incumbent = incumbent
+    _worker_weights = weights
+    _worker_limit = limit
+
+
+def _brute_force_shard(prefix):
+    # Returns the first partition (in rgs_partitions order) with the fewest
+    # trips among those starting with 'prefix', or None if it cannot match
+    # the fewest trips found by any worker so far
+    weights = _worker_weights
+    block_ok = lambda block: sum(weights[i] for i in block) <= _worker_limit
+
+    best = None
+    max_trips = _worker_incumbent.value
+    while True:
+        # Restarting with fewer trips allowed finds the first partition with
+        # fewer trips: every partition before the last one found had more
+        partition = next(rgs_partitions(len(weights), block_ok, max_trips, prefix), None)
+        if partition is None:
+            return best
+        best = partition
+
+        # Share the new best (ties are still searched, which keeps the
+        # result of each shard the same whatever the other workers do)
+        with _worker_incumbent.get_lock():
+            if len(best) < _worker_incumbent.value:
+                _worker_incumbent.value = len(best)
+            max_trips = min(len(best) - 1, _worker_incumbent.value)
+
+
+# Problem 3 (extension): exact solver that scales past a dozen cows
+def branch_and_bound_cow_transport(cows,limit=10):
+    """
+    Finds an allocation of cows that minimizes the number of spaceship trips,
+    like brute_force_cow_transport, but without enumerating every partition.
+    Trips are built one at a time and a branch is abandoned as soon as it
+    cannot fit the remaining cows in the number of trips being tried (see
+    branch_and_bound_trip_indices). Most herds of 30-50 cows take well under
+    a second, but the search is still exponential in the worst case: herds
+    where no cows fit together neatly (e.g. limit 1000 and weights between
+    200 and 500) can take tens of seconds or more, as many near-full ways of
+    filling each trip must be tried. Use fast_greedy_cow_transport when a
+    quick answer matters more than the fewest trips.
+
+    Does not mutate the given dictionary of cows.
+
+    Parameters:
+    cows - a dictionary of name (string), weight (int) pairs
+    limit - weight limit of the spaceship (an int - Default = 10)
+
+    Returns:
+    A list of lists, with each inner list containing the names of cows
+    transported on a particular trip and the overall list containing all the
+    trips
+
+    Raises:
+    ValueError if a cow weighs more than the limit (it cannot fly at all)
+    """
+    names = list(cows)
+    weights = [cows[name] for name in names]
+
+    # Solve on indices and map them back to cow names
+    trips = branch_and_bound_trip_indices(weights, limit)
+    return [[names[i] for i in trip] for trip in trips]
+
+
+def branch_and_bound_trip_indices(weights, limit):
+    """
+    Core of branch_and_bound_cow_transport, working on positions instead of
+    cow names.
+
+    Trips are filled one at a time ("bin completion"): the heaviest cow left
+    opens a trip, which is then completed with every maximal set of lighter
+    cows that fits. Trying k trips leaves k * limit - (total weight) of space
+    that may go unused, and a branch is cut as soon as the closed trips waste
+    more than that. k starts at a lower bound and grows until a solution is
+    found, so the first solution is optimal.
+
+    Parameters:
+    weights - a sequence of cow weights (ints)
+    limit - weight limit of the spaceship (an int)
+
+    Returns:
+    A list of lists, each inner list holding the positions (in 'weights') of
+    the cows transported on one trip, heaviest cow first
+    """
+    for weight in weights:
+        if weight > limit:
+            raise ValueError(f"A cow weighing {weight} exceeds the limit {limit}")
+
+    # Cows of equal weight are interchangeable: the search only needs to know
+    # how many cows of each weight are left. sizes[j] is the j-th heaviest
+    # weight and counts[j] the number of cows left with that weight
+    sizes = sorted(set(weights), reverse=True)
+    position = {size: j for j, size in enumerate(sizes)}
+    counts = [0] * len(sizes)
+    for weight in weights:
+        counts[position[weight]] += 1
+
+    # Initial incumbent: first-fit decreasing (always a valid allocation)
+    best = first_fit_decreasing_trip_indices(weights, limit)
+
+    # Trips chosen so far, each a list of (weight index, number of cows)
+    chosen = []
+
+    def completions(taken, j, room, available, waste_left):
+        # Yields the unused room of every maximal way of filling 'room' with
+        # the cows of weight sizes[j:], keeping 'counts' and 'taken' updated
+        if room - available > waste_left:
+            return
+        if j == len(sizes):
+            if room > waste_left:
+                return
+
+            # Skip the trip if one or two of its cows (other than the one
+            # that opened it) could be swapped for a single heavier cow that
+            # is left: some optimal allocation never uses such a trip. With
+            # no cows swapped out this also requires the trip to be maximal
+            loads = [0] + [sizes[k] for k, c in taken[1:] for _ in range(c)]
+            for a in range(len(loads)):
+                for b in range(a + 1 if a else 0, len(loads)):
+                    low = loads[a] + loads[b]
+                    for k in range(len(sizes)):
+                        if counts[k] > 0 and low < sizes[k] <= low + room:
+                            return
+            yield room
+            return
+
+        size = sizes[j]
+        available -= counts[j] * size
+        for c in range(min(counts[j], room // size), -1, -1):
+            if c > 0:
+                counts[j] -= c
+                taken.append((j, c))
+            yield from completions(taken, j + 1, room - c * size, available, waste_left)
+            if c > 0:
+                counts[j] += c
+                taken.pop()
+
+    def fill(trips_left, waste_left, dead_ends):
+        # True (with the trips in 'chosen') if the cows left fit in
+        # 'trips_left' trips wasting at most 'waste_left' of space
+        first = 0
+        while first < len(sizes) and counts[first] == 0:
+            first += 1
+        if first == len(sizes):
+            return True
+        if trips_left == 0:
+            return False
+
+        # Cows heavier than half the limit never share a trip
+        heavy = 0
+        k = first
+        while k < len(sizes) and 2 * sizes[k] > limit:
+            heavy += counts[k]
+            k += 1
+        if heavy > trips_left:
+            return False
+
+        # The same cows left with the same trips to spare always lead to the
+        # same answer
+        state = (trips_left, tuple(counts))
+        if state in dead_ends:
+            return False
+
+        # The heaviest cow left opens the next trip
+        counts[first] -= 1
+        taken = [(first, 1)]
+        room = limit - sizes[first]
+        available = sum(counts[k] * sizes[k] for k in range(first, len(sizes)))
+        for waste in completions(taken, first, room, available, waste_left):
+            chosen.append(list(taken))
+            if fill(trips_left - 1, waste_left - waste, dead_ends):
+                return True
+            chosen.pop()
+        counts[first] += 1
+
+        dead_ends.add(state)
+        return False
+
+    total = sum(weights)
+    for n_trips in range(trip_lower_bound(weights, limit), len(best)):
+        if fill(n_trips, n_trips * limit - total, set()):
+            # Hand out actual cows (positions) for each weight taken
+            pools = {j: [] for j in range(len(sizes))}
+            for i in range(len(weights)):
+                pools[position[weights[i]]].append(i)
+            pools = {j: iter(pool) for j, pool in pools.items()}
+            return [[next(pools[j]) for j, c in trip for _ in range(c)] for trip in chosen]
+
+    # First-fit decreasing was already optimal
+    return best
+
+
+def trip_lower_bound(weights, limit):
+    """
+    Lower bound on the number of trips needed to transport cows with the given
+    weights (the L2 bound of Martello and Toth). Besides the total weight, it
+    uses the fact that two cows heavier than half the limit never share a trip.
+
+    Parameters:
+    weights - a sequence of cow weights (ints), none of them above 'limit'
+    limit - weight limit of the spaceship (an int)
+
+    Returns:
+    int, a number of trips that no valid allocation can go below
+    """
+    # Every trip carries at most 'limit'
+    best = -(-sum(weights) // limit)
+
+    # For each threshold 'alpha', cows heavier than 'limit - alpha' travel
+    # alone, cows heavier than half the limit need one trip each, and the
+    # cows of at least 'alpha' must fit in the space left in those trips
+    for alpha in set([0] + [w for w in weights if 2 * w <= limit]):
+        big = 0
+        medium = 0
+        medium_weight = 0
+        small_weight = 0
+        for w in weights:
+            if w > limit - alpha:
+                big += 1
+            elif 2 * w > limit:
+                medium += 1
+                medium_weight += w
+            elif w >= alpha:
+                small_weight += w
+        overflow = small_weight - (medium * limit - medium_weight)
+        bound = big + medium + (-(-overflow // limit) if overflow > 0 else 0)
+        best = max(best, bound)
+
+    return best
+
+
+# Transport algorithms that can be compared side by side
+TRANSPORT_ALGORITHMS = {
+    "Greedy": greedy_cow_transport,
+    "Fast Greedy": fast_greedy_cow_transport,
+    "Brute Force": brute_force_cow_transport,
+    "Branch and Bound": branch_and_bound_cow_transport,
+}
+
+
 # Problem 4
-def compare_cow_transport_algorithms():
+def compare_cow_transport_algorithms(algorithms=None, filename="ps1_cow_data.txt", limit=10,
+                                     workers=1):
     """
-    Using the data from ps1_cow_data.txt and the specified weight limit, run your
-    greedy_cow_transport and brute_force_cow_transport functions here. Use the
-    default weight limits of 10 for both greedy_cow_transport and
-    brute_force_cow_transport.
-    
+    Using the data from the given file and the specified weight limit, run
+    each of the selected transport algorithms (by default every one in
+    TRANSPORT_ALGORITHMS: greedy, fast greedy, brute force and branch and
+    bound) with that same limit.
+
     Print out the number of trips returned by each method, and how long each
     method takes to run in seconds.
 
+    Parameters:
+    algorithms - names (keys of TRANSPORT_ALGORITHMS) of the algorithms to run,
+                 in order (Default = None, all of them)
+    filename - the name of the data file as a string
+    limit - weight limit of the spaceship (an int - Default = 10)
+    workers - if more than 1, brute force is also run on that many processes
+              and its speedup over the serial brute force is printed
+              (an int - Default = 1)
+
     Returns:
     Does not return anything.
     """
     # Load file
-    cows = load_cows("ps1_cow_data.txt")
-
-    # Run greedy optimization algorithm (default Limit=10)
-    start = time.time()
-    trips_greedy = greedy_cow_transport(cows)
-    end = time.time()
-
-    # Print results greedy algorithm
-    print(f"Number of trips returned by Greedy algorithm: {len(trips_greedy)}")
-    print("Trips returned by Greedy algorithm:")
-    for i in range(len(trips_greedy)):
-        print(f"Trip {i+1}: {trips_greedy[i]}")
-    print(f"How long Greedy algorithm took: {end - start} s.")
-    print("--------------------------------------------------")
+    cows = load_cows(filename)
+
+    if algorithms is None:
+        algorithms = list(TRANSPORT_ALGORITHMS)
+
+    # Run each optimization algorithm on the same herd
+    times = {}
+    for name in algorithms:
+        start = time.perf_counter()
+        trips = TRANSPORT_ALGORITHMS[name](cows, limit)
+        end = time.perf_counter()
+
+        times[name] = end - start
+        print_transport_results(name, trips, times[name])
+
+    # Parallel brute force against the serial one
+    if workers > 1:
+        if "Brute Force" not in times:
+            start = time.perf_counter()
+            brute_force_cow_transport(cows, limit)
+            times["Brute Force"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        trips = brute_force_cow_transport(cows, limit, workers)
+        end = time.perf_counter()
+
+        print_transport_results(f"Brute Force ({workers} workers)", trips, end - start)
+        print(f"Speedup over serial Brute Force: {times['Brute Force'] / (end - start):.2f}x")
+        print("--------------------------------------------------")
 
-    # Run brute force optimization algorithm (default Limit=10)
-    start = time.time()
-    trips_brute = brute_force_cow_transport(cows)
-    end = time.time()
-
-    # Print results brute force algorithm
-    print(f"Number of trips returned by Brute Force algorithm: {len(trips_brute)}")
-    print("Trips returned by Brute Force algorithm:")
-    for i in range(len(trips_brute)):
-        print(f"Trip {i+1}: {trips_brute[i]}")
-    print(f"How long Brute Force algorithm took: {end - start} s.")
+
+def print_transport_results(name, trips, seconds):
+    """
+    Prints the trips returned by a transport algorithm and how long it took.
+
+    Parameters:
+    name - name of the algorithm (a string)
+    trips - list of trips, each a list of cow names
+    seconds - running time of the algorithm in seconds (a float)
+    """
+    print(f"Number of trips returned by {name} algorithm: {len(trips)}")
+    print(f"Trips returned by {name} algorithm:")
+    for i in range(len(trips)):
+        print(f"Trip {i+1}: {trips[i]}")
+    print(f"How long {name} algorithm took: {seconds} s.")
     print("--------------------------------------------------")
 
 
+# ================================================================
+# Tests
+# ================================================================
+class TestCowTransport(unittest.TestCase):
+    def setUp(self):
+        self.cows = load_cows("ps1_cow_data.txt")
+        self.cows_2 = load_cows("ps1_cow_data_2.txt")
+
+    def _assert_valid_trips(self, cows, trips, limit=10):
+        # Every cow travels exactly once and no trip goes over the limit
+        self.assertEqual(sorted(cow for trip in trips for cow in trip), sorted(cows))
+        for trip in trips:
+            self.assertLessEqual(sum(cows[cow] for cow in trip), limit)
+
+    def test_load_cow_arrays(self):
+        names, weights = load_cow_arrays("ps1_cow_data.txt")
+        self.assertEqual(dict(zip(names, weights)), self.cows)
+        self.assertEqual(weights.typecode, "i")
+
+    def test_load_cow_arrays_bad_lines_and_duplicates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "cows.txt")
+            with open(filename, "w") as file:
+                file.write("Maggie,3\nno comma\nHerman,seven\n\nMaggie,5\n,4\nBetsy,9\n")
+
+            errors = []
+            names, weights = load_cow_arrays(filename, errors=errors)
+            self.assertEqual(names, ["Maggie", "Betsy"])
+            self.assertEqual(list(weights), [5, 9])
+            self.assertEqual([line_number for line_number, _, _ in errors], [2, 3, 6])
+
+            names, weights = load_cow_arrays(filename, "first", [])
+            self.assertEqual(list(weights), [3, 9])
+            names, weights = load_cow_arrays(filename, "keep", [])
+            self.assertEqual(names, ["Maggie", "Maggie", "Betsy"])
+            with self.assertRaises(ValueError):
+                load_cow_arrays(filename, "error", [])
+
+    def test_fast_greedy_matches_greedy(self):
+        for cows in (self.cows, self.cows_2):
+            for limit in (10, 12, 20):
+                self.assertEqual(fast_greedy_cow_transport(cows, limit),
+                                 greedy_cow_transport(cows, limit))
+
+    def test_branch_and_bound_matches_brute_force(self):
+        for cows in (self.cows, self.cows_2):
+            trips = branch_and_bound_cow_transport(cows)
+            self._assert_valid_trips(cows, trips)
+            self.assertEqual(len(trips), len(brute_force_cow_transport(cows)))
+
+    def test_parallel_brute_force(self):
+        for cows in (self.cows, self.cows_2):
+            trips = brute_force_cow_transport(cows, workers=2)
+            self._assert_valid_trips(cows, trips)
+            self.assertEqual(len(trips), len(brute_force_cow_transport(cows)))
+            # Same answer however the shards were scheduled
+            self.assertEqual(trips, brute_force_cow_transport(cows, workers=3))
+
+    def test_branch_and_bound_large_herd(self):
+        # 40 cows: far beyond what partition enumeration can handle
+        weights = [7, 6, 5, 5, 4, 4, 3, 3, 3, 2] * 4
+        cows = {f"Cow {i}": weight for i, weight in enumerate(weights)}
+        trips = branch_and_bound_cow_transport(cows)
+        self._assert_valid_trips(cows, trips)
+        self.assertEqual(len(trips), trip_lower_bound(weights, 10))
+
+    def test_branch_and_bound_cow_over_limit_raises(self):
+        with self.assertRaises(ValueError):
+            branch_and_bound_cow_transport({"Jumbo": 11, "Moo Moo": 3})
+
+
 # Run 'main' function
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,3 +1,16 @@
+from array import array
+from collections import OrderedDict
+import os
+import tempfile
+import time
+import unittest
+
+try:
+    import numpy as np
+except ImportError:             # numpy is only needed by make_weight_table_numpy
+    np = None
+
+
 def main():
     # --------------------------------
     # Test case 1:
@@ -42,7 +55,7 @@ def main():
 #================================
 
 # Problem 1
-def dp_make_weight(egg_weights, target_weight, memo = {}):
+def dp_make_weight(egg_weights, target_weight, memo = None):
     """
     Find number of eggs to bring back, using the smallest number of eggs. Assumes there is
     an infinite supply of eggs of each weight, and there is always a egg of value 1.
@@ -54,6 +67,10 @@ def dp_make_weight(egg_weights, target_weight, memo = {}):
     
     Returns: int, smallest number of eggs needed to make target weight
     """
+    # A fresh memo per call (a default dictionary would be shared by all calls)
+    if memo is None:
+        memo = {}
+
     # Initialize variabe to count number of eggs. The objective is to minimize
     # the number of eggs. Initial guess = "target_weight" # of eggs
     # (i.e., only eggs with weight = 1)
@@ -82,6 +99,412 @@ def dp_make_weight(egg_weights, target_weight, memo = {}):
     return min_eggs
 
 
+# Problem 1 (extension): no recursion, one table for many targets
+def make_weight_table(egg_weights, max_weight):
+    """
+    Builds, bottom-up, the table of the smallest number of eggs needed to make
+    every weight from 0 to max_weight. Same assumptions as dp_make_weight.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    max_weight - int, largest weight in the table
+
+    Returns: array('i') of length max_weight + 1, the smallest number of eggs for each weight
+    """
+    table = array("i", [0])
+    extend_weight_table(egg_weights, table, max_weight)
+    return table
+
+
+def extend_weight_table(egg_weights, table, max_weight, choices=None):
+    """
+    Extends, in place, a table built by make_weight_table (for the same egg
+    weights) so it covers every weight up to max_weight. Entries already in
+    the table are not recomputed. Runs in O(n * k) for n new entries and k egg
+    weights.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    table - array('i') with the smallest number of eggs for weights 0, 1, ..., len(table) - 1
+    max_weight - int, largest weight the table must cover
+    choices - OPTIONAL array('i') as long as table, extended along with it:
+              choices[w] is an egg weight used by a smallest set of eggs
+              making weight w (0 for w = 0)
+
+    Returns: None
+    """
+    if choices is None:
+        for weight in range(len(table), max_weight + 1):
+            # Best of: one egg of each weight that fits, plus the best way of
+            # making what is left (already in the table)
+            table.append(1 + min([table[weight - egg] for egg in egg_weights if egg <= weight]))
+        return
+
+    # Same, remembering which egg gave the best
+    for weight in range(len(table), max_weight + 1):
+        best_egg = 0
+        best = None
+        for egg in egg_weights:
+            if egg <= weight and (best is None or table[weight - egg] < best):
+                best_egg = egg
+                best = table[weight - egg]
+        table.append(1 + best)
+        choices.append(best_egg)
+
+
+def dp_make_weight_iterative(egg_weights, target_weight):
+    """
+    Same result as dp_make_weight, computed bottom-up with a flat table instead
+    of recursion, so large targets do not hit the recursion limit.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    target_weight - int, amount of weight we want to find eggs to fit
+
+    Returns: int, smallest number of eggs needed to make target weight
+    """
+    return make_weight_table(egg_weights, target_weight)[target_weight]
+
+
+def dp_make_weight_batch(egg_weights, target_weights):
+    """
+    Answers dp_make_weight for many targets at once, from a single table built
+    up to the largest target.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    target_weights - iterable of ints, amounts of weight we want to find eggs to fit
+
+    Returns: list of ints, smallest number of eggs needed for each target (in the same order)
+    """
+    target_weights = list(target_weights)
+    if not target_weights:
+        return []
+
+    table = make_weight_table(egg_weights, max(target_weights))
+    return [table[target] for target in target_weights]
+
+
+# Problem 1 (extension): vectorized table for huge targets
+def make_weight_table_numpy(egg_weights, max_weight, block_rows=1 << 16):
+    """
+    Same table as make_weight_table, filled with NumPy (which must be
+    installed) and stored as int32.
+
+    The table is updated one egg weight at a time. For egg weight e, the
+    entries e apart (w, w + e, w + 2e, ...) form a chain where each entry can
+    be the previous one plus an egg: entry k of a chain becomes
+    min over j <= k of (entry j + k - j), i.e. k + a running minimum of
+    (entry j - j). Laying the table out as rows of e entries turns every chain
+    into a column, so all chains are updated together with
+    np.minimum.accumulate, block_rows rows at a time to bound the memory of
+    temporaries.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    max_weight - int, largest weight in the table
+    block_rows - int, rows processed at a time
+
+    Returns: numpy int32 array of length max_weight + 1, the smallest number of eggs for each weight
+    """
+    if np is None:
+        raise ImportError("make_weight_table_numpy requires numpy")
+
+    # Weights that cannot be made yet. Small enough that adding a row number
+    # to it does not overflow int32
+    unreachable = np.int32(2**30)
+
+    # Room for a whole last row whatever the egg weight
+    size = max_weight + 1
+    table = np.full(size + max(egg_weights), unreachable, dtype=np.int32)
+    table[0] = 0
+
+    for egg in egg_weights:
+        rows = -(-size // egg)
+        chains = table[:rows * egg].reshape(rows, egg)
+
+        # Running minimum of (entry - row) down each column, block by block
+        carry = None
+        for first in range(0, rows, block_rows):
+            last = min(rows, first + block_rows)
+            row = np.arange(first, last, dtype=np.int32)[:, None]
+            block = chains[first:last] - row
+            if carry is not None:
+                np.minimum(block[0], carry, out=block[0])
+            np.minimum.accumulate(block, axis=0, out=block)
+            carry = block[-1].copy()
+            np.minimum(block + row, unreachable, out=chains[first:last])
+
+    return table[:size]
+
+
+def benchmark_numpy_table(egg_weights=(1, 5, 10, 25), small_target=900, large_target=10000000):
+    """
+    Prints how long dp_make_weight (recursive, so small_target must stay below
+    the recursion limit), make_weight_table and make_weight_table_numpy take,
+    and the speedup of the NumPy version over each.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    small_target - int, target for the comparison with the recursive version
+    large_target - int, target for the comparison with the pure Python table
+
+    Returns: None
+    """
+    def timed(function, *args):
+        start = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start
+
+    recursive, recursive_time = timed(dp_make_weight, egg_weights, small_target)
+    vectorized, vectorized_time = timed(make_weight_table_numpy, egg_weights, small_target)
+    assert recursive == vectorized[small_target]
+    print(f"n = {small_target}: recursive {recursive_time:.6f} s, numpy {vectorized_time:.6f} s "
+          f"({recursive_time / vectorized_time:.1f}x)")
+
+    table, table_time = timed(make_weight_table, egg_weights, large_target)
+    vectorized, vectorized_time = timed(make_weight_table_numpy, egg_weights, large_target)
+    assert table[large_target] == vectorized[large_target]
+    print(f"n = {large_target}: table {table_time:.3f} s, numpy {vectorized_time:.3f} s "
+          f"({table_time / vectorized_time:.1f}x)")
+
+
+# Problem 1 (extension): which eggs, not just how many
+def dp_make_weight_with_eggs(egg_weights, target_weight):
+    """
+    Like dp_make_weight, but also returns the eggs to bring back. Each entry
+    of the table records the egg that gave its best value, so the eggs are
+    found by following those choices back from target_weight, with one
+    lookup per egg.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    target_weight - int, amount of weight we want to find eggs to fit
+
+    Returns: tuple (number of eggs, list of the weights of those eggs)
+    """
+    table = array("i", [0])
+    choices = array("i", [0])
+    extend_weight_table(egg_weights, table, target_weight, choices)
+    return table[target_weight], eggs_from_choices(choices, target_weight)
+
+
+def eggs_from_choices(choices, target_weight):
+    """
+    Follows the choices recorded by extend_weight_table back from
+    target_weight.
+
+    Parameters:
+    choices - array('i') filled by extend_weight_table, covering target_weight
+    target_weight - int, amount of weight we want to find eggs to fit
+
+    Returns: list of the egg weights used
+    """
+    eggs = []
+    while target_weight > 0:
+        eggs.append(choices[target_weight])
+        target_weight -= choices[target_weight]
+    return eggs
+
+
+def iter_weight_solutions(egg_weights, start, stop, block_size=4096):
+    """
+    Yields the solution for every target weight in range(start, stop), in
+    order. The tables grow block_size weights at a time as targets are
+    consumed, so stopping early does not pay for the whole range.
+
+    Parameters:
+    egg_weights - tuple of integers, available egg weights sorted from smallest to largest value (1 = d1 < d2 < ... < dk)
+    start - int, first target weight
+    stop - int, targets go up to stop - 1
+    block_size - int, number of weights added to the tables at a time
+
+    Returns: generator of (target weight, number of eggs, list of egg weights) tuples
+    """
+    table = array("i", [0])
+    choices = array("i", [0])
+    for target_weight in range(start, stop):
+        if target_weight >= len(table):
+            extend_weight_table(egg_weights, table,
+                                min(stop - 1, target_weight + block_size), choices)
+        yield target_weight, table[target_weight], eggs_from_choices(choices, target_weight)
+
+
+# Problem 1 (extension): keep tables around between queries
+class WeightTableCache(object):
+    """
+    Keeps the tables built by make_weight_table, one per tuple of egg weights,
+    so repeated queries are answered by lookup. A table is extended in place
+    when a larger target arrives instead of being rebuilt. The tables kept in
+    memory hold at most max_entries numbers in total (4 bytes each): the
+    least recently used ones are dropped first. If a directory is given,
+    tables are also saved there (when dropped, or by save()) and loaded back
+    on the next query, even after a restart.
+    """
+    def __init__(self, max_entries=25000000, directory=None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.tables = OrderedDict()         # egg weights -> table, oldest first
+        self.entries = 0
+
+    def dp_make_weight(self, egg_weights, target_weight):
+        """
+        Same result as dp_make_weight, using (and growing) the cached table.
+        """
+        return self.get_table(egg_weights, target_weight)[target_weight]
+
+    def get_table(self, egg_weights, max_weight):
+        """
+        Returns the table for egg_weights covering at least every weight up
+        to max_weight (it must not be modified).
+        """
+        key = tuple(egg_weights)
+        if key in self.tables:
+            table = self.tables.pop(key)
+            self.entries -= len(table)
+        else:
+            # Not counted yet (new, or read back from the directory)
+            table = self.load(key)
+
+        extend_weight_table(key, table, max_weight)
+
+        # Most recently used goes last
+        self.tables[key] = table
+        self.entries += len(table)
+
+        # Stay within bounds, but never drop the table being returned
+        while self.entries > self.max_entries and len(self.tables) > 1:
+            old_key, old_table = self.tables.popitem(last=False)
+            self.entries -= len(old_table)
+            if self.directory is not None:
+                self.write(old_key, old_table)
+
+        return table
+
+    def path(self, egg_weights):
+        """
+        Name of the file where the table for egg_weights is saved.
+        """
+        name = "eggs_" + "_".join(str(egg) for egg in egg_weights) + ".bin"
+        return os.path.join(self.directory, name)
+
+    def load(self, egg_weights):
+        """
+        Reads the saved table for egg_weights, or starts a new one if there is
+        none (or no directory).
+        """
+        table = array("i", [0])
+        if self.directory is not None and os.path.exists(self.path(egg_weights)):
+            table = array("i")
+            with open(self.path(egg_weights), "rb") as file:
+                table.frombytes(file.read())
+        return table
+
+    def write(self, egg_weights, table):
+        """
+        Saves a table (raw machine ints) in the directory. The file is
+        replaced at once, so a crash never leaves half a table behind.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=self.directory)
+        with os.fdopen(handle, "wb") as file:
+            table.tofile(file)
+        os.replace(temporary, self.path(egg_weights))
+
+    def save(self):
+        """
+        Saves every table in memory to the directory.
+        """
+        for egg_weights, table in self.tables.items():
+            self.write(egg_weights, table)
+
+
+# ================================================================
+# Tests
+# ================================================================
+class TestEggs(unittest.TestCase):
+    def test_iterative_matches_recursive(self):
+        for egg_weights in ((1, 5, 10, 25), (1, 5, 10, 20), (1, 3, 4)):
+            for target in range(1, 200):
+                self.assertEqual(dp_make_weight_iterative(egg_weights, target),
+                                 dp_make_weight(egg_weights, target))
+
+    def test_default_memo_not_shared(self):
+        # Results for one set of egg weights must not leak into the next call
+        self.assertEqual(dp_make_weight((1, 5), 10), 2)
+        self.assertEqual(dp_make_weight((1, 3), 10), 4)
+
+    def test_large_target(self):
+        # Far deeper than the recursion limit
+        self.assertEqual(dp_make_weight_iterative((1, 5, 10, 25), 100000), 4000)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_table(self):
+        for egg_weights in ((1, 5, 10, 25), (1, 5, 10, 20), (1, 3, 4)):
+            table = make_weight_table_numpy(egg_weights, 999, block_rows=16)
+            self.assertEqual(table.dtype, np.int32)
+            self.assertEqual(table.tolist(), list(make_weight_table(egg_weights, 999)))
+
+        # Without eggs of weight 1, weights that cannot be made stay out of reach
+        self.assertEqual(make_weight_table_numpy((2, 7), 11).tolist()[:6],
+                         [0, 2**30, 1, 2**30, 2, 2**30])
+
+    def test_with_eggs(self):
+        count, eggs = dp_make_weight_with_eggs((1, 5, 10, 25), 99)
+        self.assertEqual(count, 9)
+        self.assertEqual(sorted(eggs, reverse=True), [25, 25, 25, 10, 10, 1, 1, 1, 1])
+        for egg_weights in ((1, 5, 10, 20), (1, 3, 4)):
+            for target, count, eggs in iter_weight_solutions(egg_weights, 0, 300, block_size=7):
+                self.assertEqual(count, dp_make_weight_iterative(egg_weights, target))
+                self.assertEqual(len(eggs), count)
+                self.assertEqual(sum(eggs), target)
+
+    def test_cache_extends_and_evicts(self):
+        cache = WeightTableCache(max_entries=300)
+        self.assertEqual(cache.dp_make_weight((1, 5, 10, 25), 99), 9)
+        self.assertEqual(len(cache.tables[(1, 5, 10, 25)]), 100)
+
+        # A larger target extends the same table
+        self.assertEqual(cache.dp_make_weight((1, 5, 10, 25), 199), 13)
+        self.assertEqual(len(cache.tables[(1, 5, 10, 25)]), 200)
+
+        # Over the bound: the least recently used weights are dropped
+        self.assertEqual(cache.dp_make_weight((1, 5, 10, 20), 199), 15)
+        self.assertEqual(list(cache.tables), [(1, 5, 10, 20)])
+
+    def test_cache_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = WeightTableCache(directory=directory)
+            cache.dp_make_weight((1, 5, 10, 25), 500)
+            cache.save()
+
+            # A new cache (as after a restart) reads the table back
+            restarted = WeightTableCache(directory=directory)
+            table = restarted.load((1, 5, 10, 25))
+            self.assertEqual(len(table), 501)
+            self.assertEqual(restarted.dp_make_weight((1, 5, 10, 25), 99), 9)
+
+    def test_cache_bound_after_reload(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = WeightTableCache(directory=directory)
+            cache.dp_make_weight((1, 5, 10, 25), 10000)
+            cache.dp_make_weight((1, 5, 10, 20), 10000)
+            cache.save()
+
+            # Tables read back from disk count towards the bound too
+            restarted = WeightTableCache(max_entries=15000, directory=directory)
+            restarted.dp_make_weight((1, 5, 10, 25), 99)
+            self.assertEqual(restarted.entries, 10001)
+            restarted.dp_make_weight((1, 5, 10, 20), 99)
+            self.assertEqual(list(restarted.tables), [(1, 5, 10, 20)])
+            self.assertEqual(restarted.entries, 10001)
+
+    def test_batch(self):
+        targets = [99, 0, 7, 30, 99]
+        self.assertEqual(dp_make_weight_batch((1, 5, 10, 25), targets),
+                         [dp_make_weight_iterative((1, 5, 10, 25), t) for t in targets])
+
+
 # Run 'main' function
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,3 +1,10 @@
+from array import array
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
 import unittest
 
 # ------------------------------------------------
@@ -6,10 +13,22 @@ import unittest
 # Node object
 class Node(object):
     """
-    Represents a node in the graph
+    Represents a node in the graph. Nodes cannot be changed once created,
+    which lets them keep their hash instead of asking the name every time.
     """
+    __slots__ = ("name", "hash")
+
     def __init__(self, name):
-        self.name = str(name)
+        name = str(name)
+        set_node_name(self, name)
+        set_node_hash(self, hash(name))
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError("Node objects cannot be changed")
+
+    def __reduce__(self):
+        # Rebuild through __init__ (pickle and copy would set the slots)
+        return (Node, (self.name,))
 
     def get_name(self):
         return self.name
@@ -21,25 +40,40 @@ class Node(object):
         return self.name
 
     def __eq__(self, other):
-        return self.name == other.name
+        return self is other or self.name == other.name
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
     def __hash__(self):
         # This function is necessary so that Nodes can be used as
-        # keys in a dictionary, even though Nodes are mutable
-        return self.name.__hash__()
+        # keys in a dictionary (computed once, since Nodes cannot change)
+        return self.hash
+
+
+# Setting the slots directly skips the __setattr__ that makes Nodes and
+# edges read-only (faster than calling object.__setattr__)
+set_node_name = Node.name.__set__
+set_node_hash = Node.hash.__set__
 
 
 # Edge object
 class Edge(object):
     """
     Represents an edge in the dictionary. Includes a source and a destination.
+    Edges cannot be changed once created.
     """
+    __slots__ = ("src", "dest")
+
     def __init__(self, src, dest):
-        self.src = src
-        self.dest = dest
+        set_edge_source(self, src)
+        set_edge_destination(self, dest)
+
+    def __setattr__(self, attribute, value):
+        raise AttributeError("Edge objects cannot be changed")
+
+    def __reduce__(self):
+        return (Edge, (self.src, self.dest))
 
     def get_source(self):
         return self.src
@@ -51,15 +85,24 @@ class Edge(object):
         return "{}->{}".format(self.src, self.dest)
 
 
+set_edge_source = Edge.src.__set__
+set_edge_destination = Edge.dest.__set__
+
+
 # WeightedEdge object
 class WeightedEdge(Edge):
+    __slots__ = ("total_distance", "outdoor_distance")
+
     def __init__(self, src, dest, total_distance, outdoor_distance):
         # Inherit properties from "Edge" class
         Edge.__init__(self, src, dest)
 
         # Initialize new parameters not in Edge class
-        self.total_distance = total_distance
-        self.outdoor_distance = outdoor_distance
+        set_edge_total_distance(self, total_distance)
+        set_edge_outdoor_distance(self, outdoor_distance)
+
+    def __reduce__(self):
+        return (WeightedEdge, (self.src, self.dest, self.total_distance, self.outdoor_distance))
 
     def get_total_distance(self):
         return self.total_distance
@@ -76,6 +119,10 @@ class WeightedEdge(Edge):
         return f"{name_src}->{name_dest} ({total_d}, {outdoor_d})"
 
 
+set_edge_total_distance = WeightedEdge.total_distance.__set__
+set_edge_outdoor_distance = WeightedEdge.outdoor_distance.__set__
+
+
 # Digraph object
 class Digraph(object):
     """
@@ -84,6 +131,10 @@ class Digraph(object):
     def __init__(self):
         self.nodes = set([])
         self.edges = {}                     # must be a dict of Node -> list of edges
+        self.listeners = []                 # called with each edge added
+        self.version = 0                    # bumped by every change
+        self.query_cache = None             # set by ps2.enable_query_cache
+        self.reverse_edges = None           # built by get_edges_into_node
 
     def __str__(self):
         edge_strs = []
@@ -99,6 +150,19 @@ class Digraph(object):
     def has_node(self, node):
         return node in self.nodes
 
+    def get_edges_into_node(self, node):
+        """
+        Returns the list of edges whose destination is node. The index of
+        these lists is built on the first call and then kept up to date by
+        add_node and add_edge.
+        """
+        if self.reverse_edges is None:
+            self.reverse_edges = {other: [] for other in self.edges}
+            for edges in self.edges.values():
+                for edge in edges:
+                    self.reverse_edges[edge.get_destination()].append(edge)
+        return self.reverse_edges[node]
+
     def add_node(self, node):
         """
         Adds a Node object to the Digraph. Raises a ValueError if it is
@@ -110,6 +174,9 @@ class Digraph(object):
         else:
             self.nodes.add(node)
             self.edges[node] = []
+            self.version += 1
+            if self.reverse_edges is not None:
+                self.reverse_edges[node] = []
 
     def add_edge(self, edge):
         """
@@ -128,6 +195,251 @@ class Digraph(object):
         # If we reach this line, then append node to edge
         # self.edges[src].append(w_edge)
         self.edges[src].append(edge)
+        self.version += 1
+        if self.reverse_edges is not None:
+            self.reverse_edges[dest].append(edge)
+
+        # Let whoever keeps results computed on this graph know
+        for listener in self.listeners:
+            listener(edge)
+
+    def add_listener(self, listener):
+        """
+        Registers a function to be called with every edge added from now on
+        (after it is added).
+        """
+        self.listeners.append(listener)
+
+    def to_csr(self):
+        """
+        Returns a CSRDigraph with the same nodes and weighted edges. Node ids
+        follow the order in which nodes were added, and the edges of each
+        node keep the order in which they were added.
+        """
+        names = [node.get_name() for node in self.edges]
+        ids = {node: i for i, node in enumerate(self.edges)}
+
+        offsets = array("q", [0])
+        targets = array("i")
+        total_distances = array("i")
+        outdoor_distances = array("i")
+        for edges in self.edges.values():
+            for edge in edges:
+                targets.append(ids[edge.get_destination()])
+                total_distances.append(edge.get_total_distance())
+                outdoor_distances.append(edge.get_outdoor_distance())
+            offsets.append(len(targets))
+
+        return CSRDigraph(names, offsets, targets, total_distances, outdoor_distances)
+
+    def save_snapshot(self, filename):
+        """
+        Writes the graph to a binary snapshot file (see CSRDigraph.save).
+        """
+        self.to_csr().save(filename)
+
+    @classmethod
+    def load_snapshot(cls, filename):
+        """
+        Reads a Digraph back from a binary snapshot file. CSRDigraph.load is
+        much faster when a CSRDigraph is enough.
+        """
+        return CSRDigraph.load(filename).to_digraph()
+
+
+# Layout of the header of binary snapshot files: magic, format version, byte
+# order of the arrays (0 little, 1 big endian), then the number of nodes,
+# edges and bytes of node names
+SNAPSHOT_MAGIC = b"CSRGRAPH"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<8sIIqqq")
+
+
+# CSRDigraph object
+class CSRDigraph(object):
+    """
+    Represents a directed graph of weighted edges in compressed sparse row
+    form: nodes are numbered 0..n-1 and the edges leaving node i are entries
+    offsets[i] to offsets[i+1]-1 of the arrays targets (destination ids),
+    total_distances and outdoor_distances. It cannot be changed, and takes a
+    few bytes per edge instead of an object per edge. Build one with
+    Digraph.to_csr().
+    """
+    def __init__(self, names, offsets, targets, total_distances, outdoor_distances):
+        self.names = names                  # id -> node name
+        self.ids = {name: i for i, name in enumerate(names)}
+        self.offsets = offsets
+        self.targets = targets
+        self.total_distances = total_distances
+        self.outdoor_distances = outdoor_distances
+        self.reverse = None                 # built by reversed()
+
+    def __str__(self):
+        edge_strs = []
+        for src in range(len(self.names)):
+            for e in range(self.offsets[src], self.offsets[src + 1]):
+                edge_strs.append("{}->{} ({}, {})".format(
+                    self.names[src], self.names[self.targets[e]],
+                    self.total_distances[e], self.outdoor_distances[e]))
+        edge_strs = sorted(edge_strs)       # sort alphabetically
+        return '\n'.join(edge_strs)         # concat edge_strs with "\n"s between them
+
+    def num_nodes(self):
+        return len(self.names)
+
+    def num_edges(self):
+        return len(self.targets)
+
+    def has_node(self, name):
+        return name in self.ids
+
+    def get_id(self, name):
+        return self.ids[name]
+
+    def get_name(self, node_id):
+        return self.names[node_id]
+
+    def get_edge_range(self, node_id):
+        """
+        Positions, in targets and the distance arrays, of the edges leaving
+        the node with the given id.
+        """
+        return range(self.offsets[node_id], self.offsets[node_id + 1])
+
+    def reversed(self):
+        """
+        Returns the CSRDigraph with every edge turned around (same node ids).
+        It is built the first time and kept, since neither graph can change.
+        """
+        if self.reverse is None:
+            n = len(self.names)
+
+            # Count the edges arriving at each node, then place each edge
+            counts = [0] * (n + 1)
+            for dest in self.targets:
+                counts[dest + 1] += 1
+            offsets = array("q", counts)
+            for i in range(n):
+                offsets[i + 1] += offsets[i]
+
+            m = len(self.targets)
+            targets = array("i", bytes(4 * m))
+            total_distances = array("i", bytes(4 * m))
+            outdoor_distances = array("i", bytes(4 * m))
+            position = list(offsets[:n])
+            for src in range(n):
+                for e in range(self.offsets[src], self.offsets[src + 1]):
+                    dest = self.targets[e]
+                    p = position[dest]
+                    position[dest] += 1
+                    targets[p] = src
+                    total_distances[p] = self.total_distances[e]
+                    outdoor_distances[p] = self.outdoor_distances[e]
+
+            self.reverse = CSRDigraph(self.names, offsets, targets,
+                                      total_distances, outdoor_distances)
+            self.reverse.reverse = self
+
+        return self.reverse
+
+    def save(self, filename):
+        """
+        Writes the graph to a binary snapshot file: a header, the node names
+        (UTF-8, with an array of where each one starts), then offsets,
+        targets and both distance arrays as raw machine integers, each block
+        padded to a multiple of 8 bytes. The file is written next to its
+        final place and then renamed, so readers never see half a snapshot.
+        """
+        encoded = [name.encode("utf-8") for name in self.names]
+        name_offsets = array("q", [0])
+        for name in encoded:
+            name_offsets.append(name_offsets[-1] + len(name))
+        name_bytes = b"".join(encoded)
+
+        header = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                      sys.byteorder == "big",
+                                      len(self.names), len(self.targets), len(name_bytes))
+        blocks = [header, name_offsets, name_bytes,
+                  array("q", self.offsets), array("i", self.targets),
+                  array("i", self.total_distances), array("i", self.outdoor_distances)]
+
+        directory = os.path.dirname(os.path.abspath(filename))
+        fd, temp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                for block in blocks:
+                    data = bytes(block)
+                    file.write(data)
+                    file.write(bytes(-len(data) % 8))
+            os.replace(temp_name, filename)
+        except BaseException:
+            os.remove(temp_name)
+            raise
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads a graph written by save. The file is memory-mapped and the
+        arrays of the returned graph are views of it, so nothing is copied:
+        pages are read from disk only when used, and processes loading the
+        same file share them. Only the node names are decoded.
+        Raises a ValueError if the file is not a snapshot.
+        """
+        with open(filename, "rb") as file:
+            size = os.fstat(file.fileno()).st_size
+            if size < SNAPSHOT_HEADER.size:
+                raise ValueError("Not a graph snapshot: " + filename)
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(mapped)
+        magic, version, big_endian, n, m, names_size = SNAPSHOT_HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a graph snapshot: " + filename)
+        swap = bool(big_endian) != (sys.byteorder == "big")
+
+        position = SNAPSHOT_HEADER.size
+        def block(typecode, size):
+            # Next block of the file, viewed as an array of typecode items
+            nonlocal position
+            itemsize = struct.calcsize(typecode)
+            data = view[position:position + size * itemsize]
+            if len(data) != size * itemsize:
+                raise ValueError("Truncated graph snapshot: " + filename)
+            position += -(-len(data) // 8) * 8
+            if typecode == "B":
+                return data
+            if swap:
+                # Written on a machine of the other byte order: copy
+                items = array(typecode)
+                items.frombytes(data)
+                items.byteswap()
+                return items
+            return data.cast(typecode)
+
+        name_offsets = block("q", n + 1)
+        name_bytes = bytes(block("B", names_size))
+        names = [name_bytes[name_offsets[i]:name_offsets[i + 1]].decode("utf-8")
+                 for i in range(n)]
+        offsets = block("q", n + 1)
+        targets = block("i", m)
+        total_distances = block("i", m)
+        outdoor_distances = block("i", m)
+
+        return cls(names, offsets, targets, total_distances, outdoor_distances)
+
+    def to_digraph(self):
+        """
+        Returns an equivalent (modifiable) Digraph.
+        """
+        digraph = Digraph()
+        nodes = [Node(name) for name in self.names]
+        for node in nodes:
+            digraph.add_node(node)
+        for src in range(len(nodes)):
+            for e in self.get_edge_range(src):
+                digraph.add_edge(WeightedEdge(nodes[src], nodes[self.targets[e]],
+                                              self.total_distances[e], self.outdoor_distances[e]))
+        return digraph
 
 
 # ================================================================
@@ -165,6 +477,39 @@ class TestGraph(unittest.TestCase):
         self.assertEqual(self.e2.get_outdoor_distance(), 6)
         self.assertEqual(self.e3.get_outdoor_distance(), 1)
 
+    def test_add_edge_calls_listeners(self):
+        added = []
+        self.g.add_listener(added.append)
+        e4 = WeightedEdge(self.nc, self.na, 7, 2)
+        self.g.add_edge(e4)
+        self.assertEqual(added, [e4])
+
+    def test_edges_into_node(self):
+        self.assertEqual(self.g.get_edges_into_node(self.nc), [self.e2, self.e3])
+        self.assertEqual(self.g.get_edges_into_node(self.na), [])
+
+        # The index follows later changes
+        nd = Node('d')
+        self.g.add_node(nd)
+        e4 = WeightedEdge(self.nc, nd, 7, 2)
+        self.g.add_edge(e4)
+        self.assertEqual(self.g.get_edges_into_node(nd), [e4])
+
+    def test_nodes_and_edges_cannot_change(self):
+        with self.assertRaises(AttributeError):
+            self.na.name = 'z'
+        with self.assertRaises(AttributeError):
+            self.e1.total_distance = 0
+        with self.assertRaises(AttributeError):
+            self.e1.color = 'red'
+        self.assertEqual(hash(self.na), hash(Node('a')))
+
+    def test_pickle_nodes_and_edges(self):
+        e1 = pickle.loads(pickle.dumps(self.e1))
+        self.assertEqual(str(e1), str(self.e1))
+        self.assertEqual(e1.get_source(), self.na)
+        self.assertEqual(hash(e1.get_source()), hash(self.na))
+
     def test_add_edge_to_nonexistent_node_raises(self):
         node_not_in_graph = Node('q')
         no_src = WeightedEdge(self.nb, node_not_in_graph, 5, 5)
@@ -184,6 +529,65 @@ class TestGraph(unittest.TestCase):
         self.assertEqual(str(self.g), expected)
 
 
+class TestCSRDigraph(unittest.TestCase):
+    def setUp(self):
+        self.g = Digraph()
+        self.na = Node('a')
+        self.nb = Node('b')
+        self.nc = Node('c')
+        self.g.add_node(self.na)
+        self.g.add_node(self.nb)
+        self.g.add_node(self.nc)
+        self.g.add_edge(WeightedEdge(self.na, self.nb, 15, 10))
+        self.g.add_edge(WeightedEdge(self.na, self.nc, 14, 6))
+        self.g.add_edge(WeightedEdge(self.nb, self.nc, 3, 1))
+        self.csr = self.g.to_csr()
+
+    def test_arrays(self):
+        self.assertEqual(self.csr.names, ['a', 'b', 'c'])
+        self.assertEqual(list(self.csr.offsets), [0, 2, 3, 3])
+        self.assertEqual(list(self.csr.targets), [1, 2, 2])
+        self.assertEqual(list(self.csr.total_distances), [15, 14, 3])
+        self.assertEqual(list(self.csr.outdoor_distances), [10, 6, 1])
+
+    def test_edge_range(self):
+        a = self.csr.get_id('a')
+        self.assertEqual([self.csr.get_name(self.csr.targets[e]) for e in self.csr.get_edge_range(a)],
+                         ['b', 'c'])
+        self.assertEqual(len(self.csr.get_edge_range(self.csr.get_id('c'))), 0)
+
+    def test_reversed(self):
+        reverse = self.csr.reversed()
+        self.assertEqual(str(reverse), "b->a (15, 10)\nc->a (14, 6)\nc->b (3, 1)")
+        self.assertIs(reverse.reversed(), self.csr)
+
+    def test_round_trip_str(self):
+        self.assertEqual(str(self.csr), str(self.g))
+        self.assertEqual(str(self.csr.to_digraph()), str(self.g))
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "graph.bin")
+            self.csr.save(filename)
+            loaded = CSRDigraph.load(filename)
+            self.assertEqual(loaded.names, self.csr.names)
+            self.assertEqual(list(loaded.offsets), list(self.csr.offsets))
+            self.assertEqual(list(loaded.targets), list(self.csr.targets))
+            self.assertEqual(str(loaded), str(self.g))
+            self.assertEqual(str(loaded.reversed()), str(self.csr.reversed()))
+
+            self.g.save_snapshot(filename)
+            self.assertEqual(str(Digraph.load_snapshot(filename)), str(self.g))
+
+    def test_snapshot_bad_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "graph.bin")
+            with open(filename, "wb") as file:
+                file.write(b"32 76 54 23\n" * 10)
+            with self.assertRaises(ValueError):
+                CSRDigraph.load(filename)
+
+
 # Run 'main' fucntion
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,132 @@
+# Benchmark of the memory and time taken by the Node and WeightedEdge
+# classes of graph.py, against copies of the original classes (regular
+# attributes in a __dict__, hash computed on every dictionary probe).
+
+import gc
+import random
+import time
+import tracemalloc
+
+from graph import Node, WeightedEdge
+
+
+def main():
+    # Same 1M-edge graph with both sets of classes
+    compare_classes(num_edges=1000000)
+
+
+# ------------------------------------------------
+# Original classes
+# ------------------------------------------------
+class LegacyNode(object):
+    def __init__(self, name):
+        self.name = str(name)
+
+    def get_name(self):
+        return self.name
+
+    def __eq__(self, other):
+        return self.name == other.name
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return self.name.__hash__()
+
+
+class LegacyEdge(object):
+    def __init__(self, src, dest):
+        self.src = src
+        self.dest = dest
+
+    def get_source(self):
+        return self.src
+
+    def get_destination(self):
+        return self.dest
+
+
+class LegacyWeightedEdge(LegacyEdge):
+    def __init__(self, src, dest, total_distance, outdoor_distance):
+        LegacyEdge.__init__(self, src, dest)
+        self.total_distance = total_distance
+        self.outdoor_distance = outdoor_distance
+
+    def get_total_distance(self):
+        return self.total_distance
+
+    def get_outdoor_distance(self):
+        return self.outdoor_distance
+
+
+# ------------------------------------------------
+# Benchmark
+# ------------------------------------------------
+def build_edges(node_class, edge_class, lines):
+    """
+    Builds the dictionary Node -> list of edges of a Digraph from a list of
+    (src name, dest name, total, outdoor) tuples, with one Node per name.
+    """
+    nodes = {}
+    edges = {}
+    for src, dest, total, outdoor in lines:
+        if src not in nodes:
+            nodes[src] = node_class(src)
+            edges[nodes[src]] = []
+        if dest not in nodes:
+            nodes[dest] = node_class(dest)
+            edges[nodes[dest]] = []
+        edges[nodes[src]].append(edge_class(nodes[src], nodes[dest], total, outdoor))
+    return edges
+
+
+def measure(node_class, edge_class, lines):
+    """
+    Returns (MB held by the graph, seconds to build it, seconds to look up
+    every edge list by a new Node made from its name, as ps2.py does).
+    """
+    # Time without tracing (tracemalloc slows every allocation down)
+    gc.collect()
+    start = time.perf_counter()
+    edges = build_edges(node_class, edge_class, lines)
+    build_seconds = time.perf_counter() - start
+
+    names = [src for src, _, _, _ in lines]
+    start = time.perf_counter()
+    for name in names:
+        edges[node_class(name)]
+    lookup_seconds = time.perf_counter() - start
+    del edges, names
+
+    # Then build it again to measure its memory
+    gc.collect()
+    tracemalloc.start()
+    edges = build_edges(node_class, edge_class, lines)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return size / 2 ** 20, build_seconds, lookup_seconds
+
+
+def compare_classes(num_edges=1000000, seed=0):
+    """
+    Prints memory and time for the original and the current classes on the
+    same random graph.
+    """
+    rng = random.Random(seed)
+    num_nodes = num_edges // 8
+    lines = [(str(rng.randrange(num_nodes)), str(rng.randrange(num_nodes)),
+              rng.randint(1, 200), rng.randint(0, 200)) for _ in range(num_edges)]
+
+    print(f"{num_edges} edges, {num_nodes} nodes")
+    for title, node_class, edge_class in (("original", LegacyNode, LegacyWeightedEdge),
+                                          ("slots", Node, WeightedEdge)):
+        size, build_seconds, lookup_seconds = measure(node_class, edge_class, lines)
+        print(f"    {title:>8}: {size:7.1f} MB, build {build_seconds:.2f} s, "
+              f"lookups {lookup_seconds:.2f} s")
+
+
+# Run 'main' function
+if __name__ == "__main__":
+    main()
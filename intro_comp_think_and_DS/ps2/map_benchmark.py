@@ -0,0 +1,97 @@
+# Benchmark of the map loaders in ps2.py on a large synthetic map
+
+import os
+import random
+import tempfile
+import time
+
+from graph import CSRDigraph
+from ps2 import load_map, load_map_bulk, load_map_csr
+
+
+def main():
+    # Time every loader on a map with one million edges
+    benchmark_loaders(num_edges=1000000)
+
+
+# Loaders to compare: functions of a map file name returning a graph
+LOADERS = {
+    "load_map": load_map,
+    "load_map_bulk": load_map_bulk,
+    "load_map_csr": load_map_csr,
+}
+
+
+def write_synthetic_map(filename, num_edges, num_nodes=None, seed=None):
+    """
+    Writes a random map file in the same format as mit_map.txt.
+
+    Parameters:
+    filename - name of the file to write
+    num_edges - number of lines (edges) in the map (an int)
+    num_nodes - OPTIONAL number of buildings, num_edges // 8 by default
+    seed - OPTIONAL seed for the random generator, to get the same map back
+    """
+    rng = random.Random(seed)
+    if num_nodes is None:
+        num_nodes = max(2, num_edges // 8)
+
+    with open(filename, "w") as file:
+        lines = []
+        for _ in range(num_edges):
+            total = rng.randint(1, 200)
+            outdoor = rng.choice((0, rng.randint(0, total)))
+            lines.append(f"{rng.randrange(num_nodes)} {rng.randrange(num_nodes)} {total} {outdoor}\n")
+            # Write in chunks to keep memory low
+            if len(lines) == 100000:
+                file.writelines(lines)
+                lines = []
+        file.writelines(lines)
+
+
+def benchmark_loaders(loaders=None, num_edges=1000000, seed=0):
+    """
+    Loads the same synthetic map with each loader and prints how long it took.
+
+    Parameters:
+    loaders - OPTIONAL dictionary of loader name, function pairs (LOADERS by
+        default)
+    num_edges - number of edges of the synthetic map (an int)
+    seed - seed for the random map
+
+    Returns:
+    a dictionary of loader name, seconds pairs
+    """
+    if loaders is None:
+        loaders = LOADERS
+
+    fd, filename = tempfile.mkstemp(suffix=".txt")
+    os.close(fd)
+    snapshot = filename + ".snapshot"
+    try:
+        write_synthetic_map(filename, num_edges, seed=seed)
+
+        results = {}
+        for name, loader in loaders.items():
+            start = time.perf_counter()
+            loader(filename)
+            results[name] = time.perf_counter() - start
+            print(f"{name}: {results[name]:.2f} s for {num_edges} edges")
+
+        # Loading a binary snapshot of the same map
+        load_map_csr(filename).save(snapshot)
+        start = time.perf_counter()
+        CSRDigraph.load(snapshot)
+        results["snapshot"] = time.perf_counter() - start
+        print(f"snapshot: {results['snapshot']:.2f} s for {num_edges} edges")
+    finally:
+        os.remove(filename)
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+
+    return results
+
+
+# Run 'main' function
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
 # Finding shortest paths through MIT buildings
 
+from array import array
+import bisect
+from collections import OrderedDict
+from contextlib import contextmanager
+import heapq
+from itertools import accumulate
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
 import unittest
-from graph import Digraph, Node, WeightedEdge
+from unittest import mock
+from graph import CSRDigraph, Digraph, Node, WeightedEdge
 
 # ------------------------------------------------
 # Problem 2: Building up the Campus Map
@@ -79,6 +92,141 @@ def load_map(map_filename):
     return my_digraph
 
 
+def load_map_bulk(map_filename, verbose=False):
+    """
+    Same as load_map, but faster on large map files: each building gets a
+    single Node (looked up by name in a dict instead of being created again
+    and rejected by add_node), and the lists of edges are filled directly.
+    Prints nothing unless verbose is True.
+
+    Parameters:
+        map_filename : name of the map file
+        verbose : OPTIONAL, print a message when loading starts
+
+    Returns:
+        a Digraph representing the map
+    """
+    if verbose:
+        print("Loading map from file...")
+
+    nodes = {}                              # building name -> its Node
+    edges = {}                              # Node -> list of edges leaving it
+    with open(map_filename) as file:
+        for line in file:
+            src, dest, total_distance, outdoor_distance = line.split()
+
+            # Find (or create) the Node of each building
+            src_node = nodes.get(src)
+            if src_node is None:
+                src_node = nodes[src] = Node(src)
+                edges[src_node] = []
+            dest_node = nodes.get(dest)
+            if dest_node is None:
+                dest_node = nodes[dest] = Node(dest)
+                edges[dest_node] = []
+
+            edges[src_node].append(WeightedEdge(src_node, dest_node,
+                                                int(total_distance), int(outdoor_distance)))
+
+    # Fill in the digraph in one go
+    my_digraph = Digraph()
+    my_digraph.nodes = set(edges)
+    my_digraph.edges = edges
+    return my_digraph
+
+
+# Start of a line of a map file that is not four fields separated by blanks
+MAP_BAD_LINE = re.compile(r"^(?![ \t]*\S+[ \t]+\S+[ \t]+\S+[ \t]+\S+[ \t]*$)", re.MULTILINE)
+
+
+def load_map_csr(map_filename, verbose=False):
+    """
+    Parses the map file straight into a CSRDigraph, without creating any
+    Node or edge objects. Node ids and the order of edges are the same as
+    in load_map(map_filename).to_csr().
+
+    Parameters:
+        map_filename : name of the map file
+        verbose : OPTIONAL, print a message when loading starts
+
+    Returns:
+        a CSRDigraph representing the map
+    """
+    if verbose:
+        print("Loading map from file...")
+
+    # Read the whole file at once; every line must have the four fields of
+    # an edge (a bad line would otherwise shift the fields of the next ones)
+    with open(map_filename) as file:
+        text = file.read()
+    bad_line = MAP_BAD_LINE.search(text, 0, len(text) - text.endswith("\n"))
+    if text and bad_line is not None:
+        number = text.count("\n", 0, bad_line.start()) + 1
+        raise ValueError(f"Line {number} of {map_filename} does not have four fields")
+    fields = text.split()
+    del text
+
+    # Number the buildings in order of first appearance (src, then dest of
+    # each line, as in load_map)
+    ends = [None] * (len(fields) // 2)
+    ends[0::2] = fields[0::4]
+    ends[1::2] = fields[1::4]
+    names = list(dict.fromkeys(ends))
+    del ends
+    ids = {name: i for i, name in enumerate(names)}
+    srcs = list(map(ids.__getitem__, fields[0::4]))
+    dests = list(map(ids.__getitem__, fields[1::4]))
+    total = list(map(int, fields[2::4]))
+    outdoor = list(map(int, fields[3::4]))
+    del fields
+
+    # Group the edges by source (sorted() is stable, so the file order is
+    # kept within each source)
+    order = sorted(range(len(srcs)), key=srcs.__getitem__)
+    targets = array("i", map(dests.__getitem__, order))
+    total_distances = array("i", map(total.__getitem__, order))
+    outdoor_distances = array("i", map(outdoor.__getitem__, order))
+
+    # Edges of node i start after those of nodes 0..i-1
+    counts = [0] * (len(names) + 1)
+    for src in srcs:
+        counts[src + 1] += 1
+    offsets = array("q", accumulate(counts))
+
+    return CSRDigraph(names, offsets, targets, total_distances, outdoor_distances)
+
+
+def load_map_cached(map_filename, snapshot_filename=None, verbose=False):
+    """
+    Loads the map as a CSRDigraph from a binary snapshot (see
+    CSRDigraph.save), which is memory-mapped instead of parsed. The
+    snapshot is (re)built from the map file when it is missing or older
+    than the map file.
+
+    Parameters:
+        map_filename : name of the map file
+        snapshot_filename : OPTIONAL name of the snapshot, by default the
+            map file name followed by ".snapshot"
+        verbose : OPTIONAL, print a message when the map file is parsed
+
+    Returns:
+        a CSRDigraph representing the map
+    """
+    if snapshot_filename is None:
+        snapshot_filename = map_filename + ".snapshot"
+
+    try:
+        if os.path.getmtime(snapshot_filename) >= os.path.getmtime(map_filename):
+            return CSRDigraph.load(snapshot_filename)
+    except (OSError, ValueError):
+        # No snapshot yet, or not a valid one: build it again
+        pass
+
+    graph = load_map_csr(map_filename, verbose)
+    graph.save(snapshot_filename)
+    return graph
+
+
 # ---------------------------------
 # Problem 2c: Testing load_map
 # ---------------------------------
@@ -105,7 +253,7 @@ def load_map(map_filename):
 # ---------------------------------
 # Problem 3b: Implement get_best_path
 # ---------------------------------
-def get_best_path(digraph, start, end, path, max_dist_outdoors, best_dist, best_path):
+def get_best_path(digraph, start, end, path, max_dist_outdoors, best_dist, best_path, stats=None):
     """
     Finds the shortest path between buildings subject to constraints.
 
@@ -128,6 +276,9 @@ def get_best_path(digraph, start, end, path, max_dist_outdoors, best_dist, best_
         best_path: list of strings
             The shortest path found so far between the original start
             and end node.
+        stats: OPTIONAL SearchStats instance
+            Gets the calls, pruned branches and depth of the search counted
+            in it (see profile_search)
 
     Returns:
         A tuple with the shortest-path from start to end, represented by
@@ -146,6 +297,11 @@ def get_best_path(digraph, start, end, path, max_dist_outdoors, best_dist, best_
     current_path, total_dist, outdoor_dist = path
     current_path = current_path + [start]
 
+    # Count this call when profiling
+    if stats is not None:
+        stats.calls += 1
+        stats.max_depth = max(stats.max_depth, len(current_path))
+
     # Default case (recursion): If start = end, destination reached
     if start == end:
         # If we are on a better path, update
@@ -171,12 +327,19 @@ def get_best_path(digraph, start, end, path, max_dist_outdoors, best_dist, best_
                 # Compute new path recursively
                 new_path = get_best_path(digraph, str(edge.get_destination()), end,
                                          [current_path, new_total_distance, new_outdoor_distance],
-                                          outdoor_distance_left, best_dist, best_path)
+                                          max_dist_outdoors, best_dist, best_path, stats)
 
                 # Check if new path is better than previous one
                 if not(new_path == None):
                     best_path, best_dist = new_path
 
+            # Count the branch cut, and why, when profiling
+            elif stats is not None:
+                if outdoor_distance_left < 0:
+                    stats.pruned_outdoor += 1
+                else:
+                    stats.pruned_distance += 1
+
     # Return best path
     return (best_path, best_dist)
 
@@ -212,18 +375,755 @@ def directed_dfs(digraph, start, end, max_total_dist, max_dist_outdoors):
         If there exists no path that satisfies max_total_dist and
         max_dist_outdoors constraints, then raises a ValueError.
     """
+    # Time and count the query when profiling (see profile_search)
+    if profiled_queries is not None and query_stats is None:
+        return profile_query(digraph, start, end, max_total_dist, max_dist_outdoors)
+
+    # Answer repeated queries from the cache, if the digraph has one
+    cache = digraph.query_cache
+    key = (start, end, max_total_dist, max_dist_outdoors)
+    if cache is not None:
+        try:
+            best_path = cache.get(digraph, key)
+        except KeyError:
+            pass
+        else:
+            if query_stats is not None:
+                query_stats.method = "cache"
+            if best_path is None:
+                raise ValueError(f"There is no path from {start} to {end}")
+            return list(best_path)
+
+    # Without a binding outdoor limit, the shortest path is the answer if it
+    # is short enough (the map has a few edges with more outdoor than total
+    # distance, so the outdoor limit is checked before trusting it)
+    if max_dist_outdoors >= max_total_dist:
+        # Check whether 'start' and 'end' exist in the digraph
+        if not (digraph.has_node(Node(start)) and digraph.has_node(Node(end))):
+            raise ValueError("Non-existent node in the graph")
+
+        if query_stats is not None:
+            query_stats.method = "dijkstra"
+        result = bidirectional_dijkstra(digraph, start, end,
+                                        None if query_stats is None else query_stats.counts)
+        if result is None or result[1] > max_total_dist:
+            best_path = None
+        elif result[2] <= max_dist_outdoors:
+            best_path = result[0]
+        else:
+            best_path = False               # not settled: search below
+
+        if best_path is not False:
+            if cache is not None:
+                cache.put(digraph, key, None if best_path is None else list(best_path))
+            if best_path is None:
+                raise ValueError(f"There is no path from {start} to {end}")
+            return best_path
+
+    if query_stats is not None:
+        query_stats.method = "dfs"
     path = [[], 0, 0]
 
     # Find best (i.e., shortest) path between nodes
-    best_path, best_dist = get_best_path(digraph, start, end, path, max_dist_outdoors, max_total_dist, None)
+    best_path, best_dist = get_best_path(digraph, start, end, path, max_dist_outdoors, max_total_dist, None,
+                                         query_stats)
+    if best_path is not None and best_dist > max_total_dist:
+        best_path = None
+
+    if cache is not None:
+        cache.put(digraph, key, None if best_path is None else list(best_path))
 
     # If no path between nodes, inform the user
-    if not(best_path == None) and best_dist <= max_total_dist:
+    if not(best_path == None):
         return best_path
     else:
         raise ValueError(f"There is no path from {start} to {end}")
 
 
+class QueryCache(object):
+    """
+    Least recently used cache of directed_dfs results (paths, or None when
+    there is no path) for one Digraph, keyed by (start, end, max_total_dist,
+    max_dist_outdoors). The cache remembers the version of the digraph its
+    results were computed on and is emptied as soon as the digraph changes
+    (add_node and add_edge bump the version). Counts hits, misses,
+    evictions and invalidations for monitoring.
+    """
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.results = OrderedDict()        # query -> result, oldest first
+        self.version = None                 # digraph version of the results
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def check_version(self, digraph):
+        # Drop every result if the digraph changed since they were computed
+        if self.version != digraph.version:
+            if self.results:
+                self.invalidations += 1
+                self.results.clear()
+            self.version = digraph.version
+
+    def get(self, digraph, key):
+        """
+        Returns the cached result of a query, or raises a KeyError.
+        """
+        self.check_version(digraph)
+        try:
+            result = self.results[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        self.results.move_to_end(key)
+        return result
+
+    def put(self, digraph, key, result):
+        """
+        Stores the result of a query, dropping the least recently used ones
+        beyond max_entries.
+        """
+        self.check_version(digraph)
+        self.results[key] = result
+        self.results.move_to_end(key)
+        while len(self.results) > self.max_entries:
+            self.results.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the counters (and current size) as a dictionary.
+        """
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "invalidations": self.invalidations, "size": len(self.results)}
+
+
+def enable_query_cache(digraph, max_entries=1024):
+    """
+    Attaches a QueryCache to digraph, so directed_dfs stops searching again
+    for queries it already answered. Returns the cache (to read its counters).
+    """
+    digraph.query_cache = QueryCache(max_entries)
+    return digraph.query_cache
+
+
+# ---------------------------------
+# Problem 3c (cont.): Profiling the search
+# ---------------------------------
+# While profile_search is active: list of the SearchStats of the queries
+# run, and stats of the query running now
+profiled_queries = None
+query_stats = None
+
+
+class SearchStats(object):
+    """
+    What one directed_dfs query did: how it was answered ("cache",
+    "dijkstra" or "dfs"), the calls of get_best_path, the branches it cut
+    because of the outdoor limit or because they could not beat the best
+    distance found, the deepest path it tried, and its wall time.
+    """
+    def __init__(self, start, end, max_total_dist, max_dist_outdoors):
+        self.query = (start, end, max_total_dist, max_dist_outdoors)
+        self.method = None
+        self.calls = 0
+        self.pruned_outdoor = 0
+        self.pruned_distance = 0
+        self.max_depth = 0
+        self.seconds = 0.0
+        self.counts = {}                    # other counters (Dijkstra expansions)
+
+    def __str__(self):
+        start, end, max_total_dist, max_dist_outdoors = self.query
+        return (f"{start}->{end} ({max_total_dist}, {max_dist_outdoors}): {self.method}, "
+                f"{self.calls} calls, pruned {self.pruned_outdoor} outdoor + "
+                f"{self.pruned_distance} distance, depth {self.max_depth}, "
+                f"{self.seconds * 1000:.3f} ms")
+
+
+@contextmanager
+def profile_search():
+    """
+    Context manager that records a SearchStats for every directed_dfs query
+    run inside it, and yields the list they are added to:
+
+        with profile_search() as queries:
+            directed_dfs(digraph, "32", "56", 1000, 0)
+        print(queries[0])
+
+    Outside it, get_best_path gets no stats and counts nothing.
+    """
+    global profiled_queries
+    previous = profiled_queries
+    profiled_queries = []
+    try:
+        yield profiled_queries
+    finally:
+        profiled_queries = previous
+
+
+def profile_query(digraph, start, end, max_total_dist, max_dist_outdoors):
+    # Runs directed_dfs with query_stats set, and records the stats even if
+    # it raises
+    global query_stats
+    query_stats = stats = SearchStats(start, end, max_total_dist, max_dist_outdoors)
+    profiled_queries.append(stats)
+    start_time = time.perf_counter()
+    try:
+        return directed_dfs(digraph, start, end, max_total_dist, max_dist_outdoors)
+    finally:
+        stats.seconds = time.perf_counter() - start_time
+        query_stats = None
+
+
+# ---------------------------------
+# Problem 3d: Label-setting search (scales to large maps)
+# ---------------------------------
+def constrained_shortest_path(digraph, start, end, max_total_dist, max_dist_outdoors):
+    """
+    Finds the same kind of path as directed_dfs (shortest total distance,
+    within both limits), without exploring every path.
+
+    Parameters:
+        digraph: Digraph or CSRDigraph instance
+            The graph on which to carry out the search. A Digraph is
+            converted with to_csr() first
+        start: string
+            Building number at which to start
+        end: string
+            Building number at which to end
+        max_total_dist: int
+            Maximum total distance on a path
+        max_dist_outdoors: int
+            Maximum distance spent outdoors on a path
+
+    Returns:
+        The shortest-path from start to end, as a list of building numbers
+        (in strings), like directed_dfs.
+
+        If there exists no path that satisfies max_total_dist and
+        max_dist_outdoors constraints, then raises a ValueError.
+    """
+    if isinstance(digraph, Digraph):
+        digraph = digraph.to_csr()
+
+    # Check whether 'start' and 'end' exist in the digraph
+    if not (digraph.has_node(start) and digraph.has_node(end)):
+        raise ValueError("Non-existent node in the graph")
+
+    result = label_setting_search(digraph, digraph.get_id(start), digraph.get_id(end),
+                                  max_total_dist, max_dist_outdoors)
+    if result is None:
+        raise ValueError(f"There is no path from {start} to {end}")
+
+    return [digraph.get_name(node) for node in result[0]]
+
+
+def label_setting_search(graph, source, target, max_total_dist, max_dist_outdoors, bounds=None,
+                         banned_nodes=(), banned_edges=(), path_edges=None):
+    """
+    Resource-constrained shortest path on a CSRDigraph (Dijkstra over
+    labels). A label is a partial path ending at some node, with its total
+    and outdoor distances. Labels are taken from a heap in order of total
+    distance plus the shortest distance left to the target (A*), then
+    outdoor distance. Labels at the same node therefore come out by
+    increasing total distance, so a label is useless (dominated) as soon as
+    a label already taken at that node has less or equal outdoor distance:
+    only the smallest outdoor distance taken per node needs remembering, and
+    the first label taken at the target is the answer. Labels that cannot
+    reach the target within either limit, even by the shortest way left, are
+    never created. Paths with cycles are always dominated, so the result is
+    loopless.
+
+    Parameters:
+        graph: CSRDigraph instance
+        source, target: int
+            Node ids of the start and end of the path
+        max_total_dist, max_dist_outdoors: int
+            Limits on the path
+        bounds: OPTIONAL result of target_bounds(graph, target), when it was
+            already computed
+        banned_nodes: OPTIONAL ids of nodes the path must not visit
+        banned_edges: OPTIONAL positions (in graph.targets) of edges the
+            path must not use
+        path_edges: OPTIONAL list, gets the positions of the edges of the
+            path appended to it (to tell parallel edges apart)
+
+    Returns:
+        A tuple (list of node ids from source to target, total distance,
+        outdoor distance), or None if no path is within the limits.
+    """
+    if bounds is None:
+        bounds = target_bounds(graph, target)
+    total_left, outdoor_left = bounds
+    if total_left[source] > max_total_dist or outdoor_left[source] > max_dist_outdoors:
+        return None
+
+    offsets = graph.offsets
+    targets = graph.targets
+    total_distances = graph.total_distances
+    outdoor_distances = graph.outdoor_distances
+
+    # Smallest outdoor distance of the labels taken so far at each node
+    # (one more than the limit means none)
+    best_outdoor = [max_dist_outdoors + 1] * graph.num_nodes()
+    for node in banned_nodes:
+        best_outdoor[node] = -1             # every label there is dominated
+
+    # Labels: node, total distance, previous label (to rebuild the path) and
+    # edge from there
+    label_nodes = [source]
+    label_totals = [0]
+    label_parents = [-1]
+    label_edges = [-1]
+    heap = [(total_left[source], 0, 0)]   # (estimated total, outdoor, label)
+
+    while heap:
+        _, outdoor, label = heapq.heappop(heap)
+        node = label_nodes[label]
+        if outdoor >= best_outdoor[node]:
+            continue
+        best_outdoor[node] = outdoor
+
+        if node == target:
+            total = label_totals[label]
+            path = []
+            edges = []
+            while label != -1:
+                path.append(label_nodes[label])
+                edges.append(label_edges[label])
+                label = label_parents[label]
+            path.reverse()
+            if path_edges is not None:
+                path_edges.extend(reversed(edges[:-1]))
+            return path, total, outdoor
+
+        total = label_totals[label]
+        for e in range(offsets[node], offsets[node + 1]):
+            if banned_edges and e in banned_edges:
+                continue
+            next_node = targets[e]
+            next_outdoor = outdoor + outdoor_distances[e]
+            if next_outdoor >= best_outdoor[next_node]:
+                continue
+            if next_outdoor + outdoor_left[next_node] > max_dist_outdoors:
+                continue
+            next_total = total + total_distances[e]
+            estimate = next_total + total_left[next_node]
+            if estimate > max_total_dist:
+                continue
+
+            label_nodes.append(next_node)
+            label_totals.append(next_total)
+            label_parents.append(label)
+            label_edges.append(e)
+            heapq.heappush(heap, (estimate, next_outdoor, len(label_nodes) - 1))
+
+    return None
+
+
+def target_bounds(graph, target):
+    """
+    Shortest total distance and shortest outdoor distance (each minimized on
+    its own) from every node to target, found with Dijkstra on the reversed
+    graph. Used by label_setting_search to cut hopeless labels.
+
+    Parameters:
+        graph: CSRDigraph instance
+        target: int
+            Node id
+
+    Returns:
+        A tuple of two lists indexed by node id; nodes that cannot reach
+        target get infinity.
+    """
+    reverse = graph.reversed()
+    return (dijkstra_distances(reverse, target, reverse.total_distances),
+            dijkstra_distances(reverse, target, reverse.outdoor_distances))
+
+
+def dijkstra_distances(graph, source, weights):
+    """
+    Shortest distances from source to every node of a CSRDigraph, using the
+    given per-edge weights (one of the graph's distance arrays).
+    """
+    distances = [float("inf")] * graph.num_nodes()
+    distances[source] = 0
+    heap = [(0, source)]
+    offsets = graph.offsets
+    targets = graph.targets
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if distance > distances[node]:
+            continue
+        for e in range(offsets[node], offsets[node + 1]):
+            next_distance = distance + weights[e]
+            if next_distance < distances[targets[e]]:
+                distances[targets[e]] = next_distance
+                heapq.heappush(heap, (next_distance, targets[e]))
+    return distances
+
+
+# ---------------------------------
+# Problem 3d (cont.): K shortest routes
+# ---------------------------------
+def k_shortest_paths(digraph, start, end, max_total_dist, max_dist_outdoors, k=None):
+    """
+    Generates the loopless paths from start to end within both limits, from
+    shortest to longest total distance (Yen's algorithm): each new path
+    leaves one of the paths found before at some node (the spur node) and
+    continues with the best path that avoids the nodes before the spur node
+    and the edges already taken from it by paths with the same beginning.
+    Those searches are done by label_setting_search with the remaining
+    limits. Paths are found one at a time, only when the caller asks for
+    the next one.
+
+    Parameters:
+        digraph: Digraph or CSRDigraph instance
+        start, end: string
+            Building numbers
+        max_total_dist, max_dist_outdoors: int
+            Limits on every path
+        k: OPTIONAL largest number of paths to generate (all by default)
+
+    Returns:
+        A generator of paths, as lists of building numbers (in strings)
+        like directed_dfs. Raises a ValueError (at once) if start or end is
+        not in the graph.
+    """
+    if isinstance(digraph, Digraph):
+        digraph = digraph.to_csr()
+
+    # Check whether 'start' and 'end' exist in the digraph
+    if not (digraph.has_node(start) and digraph.has_node(end)):
+        raise ValueError("Non-existent node in the graph")
+
+    return yen_paths(digraph, digraph.get_id(start), digraph.get_id(end),
+                     max_total_dist, max_dist_outdoors, k)
+
+
+def yen_paths(digraph, source, target, max_total_dist, max_dist_outdoors, k=None):
+    """
+    Generator behind k_shortest_paths, on a CSRDigraph with node ids.
+    """
+    start = digraph.get_name(source)
+    bounds = target_bounds(digraph, target)
+
+    def search(spur, total, outdoor, banned_nodes, banned_edges):
+        # Best way on from spur, given the distances covered before it;
+        # returns (edges, total, outdoor) of the whole path or None
+        edges = []
+        result = label_setting_search(digraph, spur, target, max_total_dist - total,
+                                      max_dist_outdoors - outdoor, bounds,
+                                      banned_nodes, banned_edges, edges)
+        if result is None:
+            return None
+        return edges, total + result[1], outdoor + result[2]
+
+    def names(edges):
+        # Path of building names taking the given edges from start
+        return [start] + [digraph.get_name(digraph.targets[e]) for e in edges]
+
+    first = search(source, 0, 0, (), ())
+    if first is None:
+        return
+
+    found = []                              # edge lists of the paths yielded
+    candidates = [(first[1], first[2], 0, tuple(first[0]))]
+    seen = {tuple(first[0])}
+    while candidates and (k is None or len(found) < k):
+        _, _, _, edges = heapq.heappop(candidates)
+        found.append(edges)
+        yield names(edges)
+        if len(found) == k:
+            return                          # no spur searches for unwanted paths
+
+        # Spur from every node of the new path (but the last one)
+        nodes = [source] + [digraph.targets[e] for e in edges]
+        total = outdoor = 0
+        for i in range(len(edges)):
+            root = edges[:i]
+            banned_edges = {path[i] for path in found if path[:i] == root and len(path) > i}
+            result = search(nodes[i], total, outdoor, nodes[:i], banned_edges)
+            if result is not None:
+                path = root + tuple(result[0])
+                if path not in seen:
+                    seen.add(path)
+                    heapq.heappush(candidates, (result[1], result[2], len(seen), path))
+
+            total += digraph.total_distances[edges[i]]
+            outdoor += digraph.outdoor_distances[edges[i]]
+
+
+# ---------------------------------
+# Problem 3e: Route table (many queries on the same map)
+# ---------------------------------
+class RouteTable(object):
+    """
+    Answers directed_dfs queries by lookup. For every source building it
+    keeps, for every destination, the Pareto frontier of routes: the routes
+    that no other route beats on both total and outdoor distance. The best
+    route for any pair of limits is on that frontier.
+
+    The table listens to the Digraph: when an edge u->v is added, the
+    frontiers of the sources that can reach u are dropped and computed
+    again (only) the next time they are needed. Nodes added later start
+    with no frontier and get one when first queried.
+    """
+    def __init__(self, digraph, build=True):
+        """
+        Parameters:
+            digraph: Digraph instance
+            build: OPTIONAL, compute the frontiers of every source now
+                (otherwise each one is computed on its first query)
+        """
+        self.digraph = digraph
+        self.frontiers = {}                 # source name -> SourceFrontier
+        self.recomputed = 0                 # number of frontiers computed
+
+        # Edges turned around (node name -> names of nodes with an edge to
+        # it), to find the sources an added edge can affect
+        self.predecessors = {}
+        for src, edges in digraph.edges.items():
+            for edge in edges:
+                self.predecessors.setdefault(edge.get_destination().get_name(), set()).add(src.get_name())
+
+        digraph.add_listener(self.edge_added)
+        if build:
+            self.build()
+
+    def build(self):
+        """
+        Computes the frontiers of all the sources that do not have one.
+        """
+        for node in self.digraph.edges:
+            self.get_frontier(node.get_name())
+
+    def get_frontier(self, start):
+        """
+        Returns the SourceFrontier of building start, computing it if needed.
+        """
+        frontier = self.frontiers.get(start)
+        if frontier is None:
+            frontier = self.frontiers[start] = SourceFrontier(self.digraph, start)
+            self.recomputed += 1
+        return frontier
+
+    def edge_added(self, edge):
+        """
+        Listener for Digraph.add_edge: drops the frontier of every source
+        that can reach the new edge.
+        """
+        src = edge.get_source().get_name()
+        dest = edge.get_destination().get_name()
+        self.predecessors.setdefault(dest, set()).add(src)
+
+        # Search backwards from src through the edges turned around
+        stack = [src]
+        seen = {src}
+        while stack:
+            node = stack.pop()
+            self.frontiers.pop(node, None)
+            for previous in self.predecessors.get(node, ()):
+                if previous not in seen:
+                    seen.add(previous)
+                    stack.append(previous)
+
+    def routes(self, start, end):
+        """
+        Returns the frontier from start to end as a list of (total distance,
+        outdoor distance) pairs, by increasing total distance.
+        """
+        return self.get_frontier(start).routes(end)
+
+    def directed_dfs(self, start, end, max_total_dist, max_dist_outdoors):
+        """
+        Same parameters, result and errors as directed_dfs(digraph, ...).
+        """
+        # Check whether 'start' and 'end' exist in the digraph
+        if not (self.digraph.has_node(Node(start)) and self.digraph.has_node(Node(end))):
+            raise ValueError("Non-existent node in the graph")
+
+        path = self.get_frontier(start).best_path(end, max_total_dist, max_dist_outdoors)
+        if path is None:
+            raise ValueError(f"There is no path from {start} to {end}")
+        return path
+
+
+class SourceFrontier(object):
+    """
+    Pareto frontiers of the routes from one source to every building,
+    found with a multi-objective label-setting search: labels (partial
+    routes) are taken from a heap by increasing (total, outdoor) distance,
+    so a label is on the frontier of its node exactly when its outdoor
+    distance is below that of every label already taken there.
+    """
+    def __init__(self, digraph, start):
+        # Labels: node name and previous label (to rebuild routes)
+        self.label_nodes = [start]
+        self.label_parents = [-1]
+
+        # Destination name -> frontier, as lists sorted by increasing total
+        # distance (so by decreasing outdoor distance) of total distances,
+        # negated outdoor distances (increasing, for bisect) and labels
+        self.totals = {}
+        self.neg_outdoors = {}
+        self.labels = {}
+
+        heap = [(0, 0, 0)]                  # (total, outdoor, label)
+        while heap:
+            total, outdoor, label = heapq.heappop(heap)
+            name = self.label_nodes[label]
+            neg_outdoors = self.neg_outdoors.get(name)
+            if neg_outdoors is None:
+                neg_outdoors = self.neg_outdoors[name] = []
+                self.totals[name] = []
+                self.labels[name] = []
+            elif -neg_outdoors[-1] <= outdoor:
+                continue                    # dominated
+            neg_outdoors.append(-outdoor)
+            self.totals[name].append(total)
+            self.labels[name].append(label)
+
+            for edge in digraph.get_edges_for_node(Node(name)):
+                next_name = edge.get_destination().get_name()
+                next_outdoor = outdoor + edge.get_outdoor_distance()
+                next_neg_outdoors = self.neg_outdoors.get(next_name)
+                if next_neg_outdoors and -next_neg_outdoors[-1] <= next_outdoor:
+                    continue
+                self.label_nodes.append(next_name)
+                self.label_parents.append(label)
+                heapq.heappush(heap, (total + edge.get_total_distance(), next_outdoor,
+                                      len(self.label_nodes) - 1))
+
+    def routes(self, end):
+        """
+        The frontier to end as a list of (total, outdoor) pairs.
+        """
+        return [(total, -neg_outdoor) for total, neg_outdoor
+                in zip(self.totals.get(end, ()), self.neg_outdoors.get(end, ()))]
+
+    def best_path(self, end, max_total_dist, max_dist_outdoors):
+        """
+        The shortest route to end within both limits, as a list of building
+        names, or None if there is none.
+        """
+        neg_outdoors = self.neg_outdoors.get(end)
+        if neg_outdoors is None:
+            return None
+
+        # First (so shortest) route on the frontier with few enough outdoors
+        i = bisect.bisect_left(neg_outdoors, -max_dist_outdoors)
+        if i == len(neg_outdoors) or self.totals[end][i] > max_total_dist:
+            return None
+
+        path = []
+        label = self.labels[end][i]
+        while label != -1:
+            path.append(self.label_nodes[label])
+            label = self.label_parents[label]
+        path.reverse()
+        return path
+
+
+# ---------------------------------
+# Problem 3f: Bidirectional Dijkstra (no outdoor limit)
+# ---------------------------------
+def bidirectional_dijkstra(digraph, start, end, stats=None):
+    """
+    Shortest path by total distance, ignoring outdoor distance. Dijkstra
+    runs forwards from start and backwards from end (through
+    Digraph.get_edges_into_node) at the same time, always growing the side
+    with the smaller frontier distance, and stops once the two searches
+    cannot find anything shorter than the best meeting point seen so far.
+    This usually settles far fewer nodes than one search would.
+
+    Parameters:
+        digraph: Digraph instance
+        start, end: string
+            Building numbers
+        stats: OPTIONAL dictionary, gets the number of nodes settled
+            ("expansions") added to it
+
+    Returns:
+        A tuple (list of building numbers, total distance, outdoor
+        distance), or None if end cannot be reached from start.
+    """
+    start, end = Node(start), Node(end)
+
+    # One side per direction: tentative distances, edge used to reach each
+    # node, settled nodes and heap of (distance, tie breaker, node)
+    distances = ({start: 0}, {end: 0})
+    parent_edges = ({start: None}, {end: None})
+    settled = (set(), set())
+    heaps = ([(0, 0, start)], [(0, 0, end)])
+    pushes = 1
+
+    best = float("inf")
+    meeting = None
+    expansions = 0
+    while heaps[0] and heaps[1]:
+        # Nothing shorter can be found once the fronts add up to best
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        distance, _, node = heapq.heappop(heaps[side])
+        if node in settled[side]:
+            continue
+        settled[side].add(node)
+        expansions += 1
+
+        if side == 0:
+            edges = digraph.get_edges_for_node(node)
+        else:
+            edges = digraph.get_edges_into_node(node)
+        for edge in edges:
+            other = edge.get_destination() if side == 0 else edge.get_source()
+            next_distance = distance + edge.get_total_distance()
+            if next_distance < distances[side].get(other, float("inf")):
+                distances[side][other] = next_distance
+                parent_edges[side][other] = edge
+                pushes += 1
+                heapq.heappush(heaps[side], (next_distance, pushes, other))
+
+                # Best path through other so far, if the other side saw it
+                if other in distances[1 - side]:
+                    through = next_distance + distances[1 - side][other]
+                    if through < best:
+                        best = through
+                        meeting = other
+
+        # start == end, or start reached end directly
+        if node in distances[1 - side] and distance + distances[1 - side][node] < best:
+            best = distance + distances[1 - side][node]
+            meeting = node
+
+    if stats is not None:
+        stats["expansions"] = stats.get("expansions", 0) + expansions
+    if meeting is None:
+        return None
+
+    # Walk back from the meeting node to start, then on to end
+    path = [meeting]
+    outdoor = 0
+    edge = parent_edges[0][meeting]
+    while edge is not None:
+        outdoor += edge.get_outdoor_distance()
+        path.append(edge.get_source())
+        edge = parent_edges[0][edge.get_source()]
+    path.reverse()
+    edge = parent_edges[1][meeting]
+    while edge is not None:
+        outdoor += edge.get_outdoor_distance()
+        path.append(edge.get_destination())
+        edge = parent_edges[1][edge.get_destination()]
+
+    return [node.get_name() for node in path], best, outdoor
+
+
 # ================================================================
 # Begin tests -- you do not need to modify anything below this line
 # ================================================================
@@ -307,6 +1207,303 @@ class Ps2Test(unittest.TestCase):
         self._test_impossible_path('10', '32', total_dist=100)
 
 
+class ConstrainedShortestPathTest(Ps2Test):
+    # Same expectations as Ps2Test, answered by the label-setting search
+    def _test_path(self,
+                   expectedPath,
+                   total_dist=Ps2Test.LARGE_DIST,
+                   outdoor_dist=Ps2Test.LARGE_DIST):
+        start, end = expectedPath[0], expectedPath[-1]
+        path = constrained_shortest_path(self.graph, start, end, total_dist, outdoor_dist)
+        self.assertEqual(expectedPath, path)
+
+    def _test_impossible_path(self,
+                              start,
+                              end,
+                              total_dist=Ps2Test.LARGE_DIST,
+                              outdoor_dist=Ps2Test.LARGE_DIST):
+        with self.assertRaises(ValueError):
+            constrained_shortest_path(self.graph, start, end, total_dist, outdoor_dist)
+
+    def test_matches_directed_dfs(self):
+        csr = self.graph.to_csr()
+        names = csr.names[:6]
+        for start in names:
+            for end in names:
+                for outdoor_dist in (0, 50, Ps2Test.LARGE_DIST):
+                    try:
+                        expected = directed_dfs(self.graph, start, end, Ps2Test.LARGE_DIST, outdoor_dist)
+                    except ValueError:
+                        expected = None
+                    try:
+                        path = constrained_shortest_path(csr, start, end, Ps2Test.LARGE_DIST, outdoor_dist)
+                    except ValueError:
+                        path = None
+                    self.assertEqual(path is None, expected is None)
+                    if path is not None:
+                        self.assertEqual(path_distances(self.graph, path),
+                                         path_distances(self.graph, expected))
+
+
+class RouteTableTest(Ps2Test):
+    # Same expectations as Ps2Test, answered by lookup in a RouteTable
+    def setUp(self):
+        Ps2Test.setUp(self)
+        self.table = RouteTable(self.graph)
+
+    def _test_path(self,
+                   expectedPath,
+                   total_dist=Ps2Test.LARGE_DIST,
+                   outdoor_dist=Ps2Test.LARGE_DIST):
+        start, end = expectedPath[0], expectedPath[-1]
+        path = self.table.directed_dfs(start, end, total_dist, outdoor_dist)
+        self.assertEqual(path_distances(self.graph, expectedPath),
+                         path_distances(self.graph, path))
+
+    def _test_impossible_path(self,
+                              start,
+                              end,
+                              total_dist=Ps2Test.LARGE_DIST,
+                              outdoor_dist=Ps2Test.LARGE_DIST):
+        with self.assertRaises(ValueError):
+            self.table.directed_dfs(start, end, total_dist, outdoor_dist)
+
+    def test_matches_constrained_shortest_path(self):
+        csr = self.graph.to_csr()
+        for start in csr.names[:8]:
+            for end in csr.names:
+                for outdoor_dist in (0, 30, 100, Ps2Test.LARGE_DIST):
+                    try:
+                        expected = path_distances(self.graph, constrained_shortest_path(
+                            csr, start, end, Ps2Test.LARGE_DIST, outdoor_dist))
+                    except ValueError:
+                        expected = None
+                    try:
+                        path = path_distances(self.graph, self.table.directed_dfs(
+                            start, end, Ps2Test.LARGE_DIST, outdoor_dist))
+                    except ValueError:
+                        path = None
+                    self.assertEqual(path, expected)
+
+    def test_add_edge_recomputes_affected_sources(self):
+        # The campus is strongly connected, so use a new building: edges out
+        # of it affect only itself, edges into it affect every source
+        new = Node("100")
+        self.graph.add_node(new)
+        self.graph.add_edge(WeightedEdge(new, Node("1"), 5, 5))
+        self.assertNotIn("100", self.table.frontiers)
+        self.assertEqual(len(self.table.frontiers), 37)
+        self.assertEqual(self.table.directed_dfs("100", "2", Ps2Test.LARGE_DIST, 5),
+                         ["100"] + self.table.directed_dfs("1", "2", Ps2Test.LARGE_DIST, 0))
+        self.assertEqual(len(self.table.frontiers), 38)
+
+        self._test_impossible_path("1", "100")
+        self.graph.add_edge(WeightedEdge(Node("1"), new, 1, 0))
+        self.assertEqual(self.table.frontiers, {})
+        self.assertEqual(self.table.directed_dfs("1", "100", 1, 0), ["1", "100"])
+        self.assertEqual(self.table.recomputed, 37 + 2)
+
+
+class QueryCacheTest(Ps2Test):
+    # Same expectations as Ps2Test, with a cache on the digraph
+    def setUp(self):
+        Ps2Test.setUp(self)
+        self.cache = enable_query_cache(self.graph, max_entries=4)
+
+    def test_repeated_query_hits(self):
+        first = directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0)
+        first.append("changed by caller")
+        second = directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0)
+        self.assertEqual(second, ["32", "36", "26", "16", "56"])
+        with self.assertRaises(ValueError):
+            directed_dfs(self.graph, "8", "50", 100, Ps2Test.LARGE_DIST)
+        with self.assertRaises(ValueError):
+            directed_dfs(self.graph, "8", "50", 100, Ps2Test.LARGE_DIST)
+        self.assertEqual(self.cache.stats(), {"hits": 2, "misses": 2, "evictions": 0,
+                                              "invalidations": 0, "size": 2})
+
+    def test_eviction(self):
+        for end in ("36", "57", "76", "68", "66"):
+            directed_dfs(self.graph, "32", end, Ps2Test.LARGE_DIST, Ps2Test.LARGE_DIST)
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertNotIn(("32", "36", Ps2Test.LARGE_DIST, Ps2Test.LARGE_DIST), self.cache.results)
+
+    def test_add_edge_invalidates(self):
+        self.assertEqual(len(directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0)), 5)
+        self.graph.add_edge(WeightedEdge(Node("32"), Node("56"), 1, 0))
+        self.assertEqual(directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0), ["32", "56"])
+        self.assertEqual(self.cache.invalidations, 1)
+        self.assertEqual(self.cache.hits, 0)
+
+
+class BidirectionalDijkstraTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = load_map_bulk("mit_map.txt")
+
+    def test_all_pairs_shortest(self):
+        csr = self.graph.to_csr()
+        for start in csr.names:
+            distances = dijkstra_distances(csr, csr.get_id(start), csr.total_distances)
+            for end in csr.names:
+                path, total, outdoor = bidirectional_dijkstra(self.graph, start, end)
+                self.assertEqual((path[0], path[-1]), (start, end))
+                self.assertEqual(total, distances[csr.get_id(end)])
+                self.assertEqual(path_distances(self.graph, path), (total, outdoor))
+
+    def test_unreachable(self):
+        self.graph.add_node(Node("100"))
+        self.assertIsNone(bidirectional_dijkstra(self.graph, "32", "100"))
+        self.assertEqual(bidirectional_dijkstra(self.graph, "100", "100"), (["100"], 0, 0))
+
+    def test_fewer_expansions_than_nodes(self):
+        stats = {}
+        bidirectional_dijkstra(self.graph, "32", "56", stats)
+        self.assertLess(stats["expansions"], len(self.graph.nodes))
+
+
+class KShortestPathsTest(unittest.TestCase):
+    def setUp(self):
+        self.graph = load_map_bulk("mit_map.txt")
+
+    def all_paths(self, start, end, max_total_dist, max_dist_outdoors):
+        # Distances of every loopless path within the limits, sorted
+        results = []
+        def extend(path, total, outdoor):
+            if path[-1] == end:
+                results.append((total, outdoor))
+                return
+            for edge in self.graph.get_edges_for_node(Node(path[-1])):
+                name = edge.get_destination().get_name()
+                next_total = total + edge.get_total_distance()
+                next_outdoor = outdoor + edge.get_outdoor_distance()
+                if (name not in path and next_total <= max_total_dist
+                        and next_outdoor <= max_dist_outdoors):
+                    extend(path + [name], next_total, next_outdoor)
+        extend([start], 0, 0)
+        return sorted(total for total, _ in results)
+
+    def test_matches_enumeration(self):
+        for start, end, max_total_dist, max_dist_outdoors in (("32", "56", 300, 50),
+                                                               ("2", "9", 200, 80),
+                                                               ("1", "1", 100, 100)):
+            expected = self.all_paths(start, end, max_total_dist, max_dist_outdoors)
+            paths = list(k_shortest_paths(self.graph, start, end, max_total_dist, max_dist_outdoors))
+            self.assertEqual([path_distances(self.graph, path)[0] for path in paths], expected)
+            self.assertEqual(len(set(map(tuple, paths))), len(paths))
+            for path in paths:
+                self.assertEqual(len(set(path)), len(path))
+                self.assertLessEqual(path_distances(self.graph, path)[1], max_dist_outdoors)
+
+    def test_first_is_best_and_lazy(self):
+        paths = k_shortest_paths(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0)
+        self.assertEqual(next(paths), directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0))
+        self.assertEqual(len(list(k_shortest_paths(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0, k=3))), 3)
+
+    def test_no_search_beyond_k(self):
+        # Count the searches made through the module
+        with mock.patch.object(sys.modules[__name__], "label_setting_search",
+                               wraps=label_setting_search) as search:
+            self.assertEqual(len(list(k_shortest_paths(self.graph, "1", "32", 1000, 1000, k=1))), 1)
+        self.assertEqual(search.call_count, 1)
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            k_shortest_paths(self.graph, "32", "nowhere", 100, 100)
+        self.assertEqual(list(k_shortest_paths(self.graph, "8", "50", 100, Ps2Test.LARGE_DIST)), [])
+
+
+class ProfileSearchTest(Ps2Test):
+    # Same expectations as Ps2Test, while profiling
+    def run(self, result=None):
+        with profile_search() as self.queries:
+            return Ps2Test.run(self, result)
+
+    def test_stats_of_dfs(self):
+        self.queries.clear()
+        directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0)
+        stats = self.queries[0]
+        self.assertEqual(stats.method, "dfs")
+        self.assertGreater(stats.calls, 1)
+        self.assertGreater(stats.pruned_outdoor, 0)
+        self.assertGreaterEqual(stats.max_depth, 5)
+        self.assertGreater(stats.seconds, 0)
+        self.assertIn("32->56", str(stats))
+
+    def test_stats_of_fast_path_and_errors(self):
+        self.queries.clear()
+        directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, Ps2Test.LARGE_DIST)
+        with self.assertRaises(ValueError):
+            directed_dfs(self.graph, "8", "50", 100, 0)
+        self.assertEqual([stats.method for stats in self.queries], ["dijkstra", "dfs"])
+        self.assertGreater(self.queries[0].counts["expansions"], 0)
+        self.assertEqual(self.queries[0].calls, 0)
+
+    def test_nested_profiles(self):
+        outer = self.queries
+        with profile_search() as inner:
+            directed_dfs(self.graph, "32", "56", Ps2Test.LARGE_DIST, 0)
+        self.assertEqual(len(inner), 1)
+        self.assertNotIn(inner[0], outer)
+        self.assertIs(profiled_queries, outer)
+
+
+class LoadMapBulkTest(unittest.TestCase):
+    def test_load_map_bulk_same_graph(self):
+        graph = load_map("mit_map.txt")
+        bulk = load_map_bulk("mit_map.txt")
+        self.assertEqual(bulk.nodes, graph.nodes)
+        self.assertEqual(str(bulk), str(graph))
+
+    def test_load_map_csr_same_graph(self):
+        expected = load_map("mit_map.txt").to_csr()
+        csr = load_map_csr("mit_map.txt")
+        self.assertIsInstance(csr, CSRDigraph)
+        self.assertEqual(csr.names, expected.names)
+        self.assertEqual(csr.offsets, expected.offsets)
+        self.assertEqual(csr.targets, expected.targets)
+        self.assertEqual(csr.total_distances, expected.total_distances)
+        self.assertEqual(csr.outdoor_distances, expected.outdoor_distances)
+
+    def test_load_map_csr_malformed_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            map_filename = os.path.join(directory, "map.txt")
+            with open(map_filename, "w") as file:
+                file.write("1 2 10\n3 4 5 6 7\n")
+            with self.assertRaisesRegex(ValueError, "Line 1 "):
+                load_map_csr(map_filename)
+            with self.assertRaises(ValueError):
+                load_map_cached(map_filename)
+            self.assertFalse(os.path.exists(map_filename + ".snapshot"))
+
+    def test_load_map_cached(self):
+        with tempfile.TemporaryDirectory() as directory:
+            map_filename = os.path.join(directory, "map.txt")
+            shutil.copy("mit_map.txt", map_filename)
+
+            # First call builds the snapshot, the second one maps it
+            first = load_map_cached(map_filename)
+            self.assertTrue(os.path.exists(map_filename + ".snapshot"))
+            second = load_map_cached(map_filename)
+            self.assertEqual(str(first), str(load_map("mit_map.txt")))
+            self.assertEqual(str(second), str(first))
+            self.assertEqual(list(second.targets), list(first.targets))
+
+
+def path_distances(digraph, path):
+    """
+    Total and outdoor distances of a path (list of building numbers) in a
+    Digraph, using the shortest edge between consecutive buildings.
+    """
+    total = outdoor = 0
+    for src, dest in zip(path, path[1:]):
+        edge = min((edge for edge in digraph.get_edges_for_node(Node(src))
+                    if edge.get_destination().get_name() == dest),
+                   key=lambda edge: edge.get_total_distance())
+        total += edge.get_total_distance()
+        outdoor += edge.get_outdoor_distance()
+    return total, outdoor
+
+
 # Run 'main' function
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
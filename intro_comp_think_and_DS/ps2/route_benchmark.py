@@ -0,0 +1,94 @@
+# Benchmark of the route searches in ps2.py: node expansions (and time) of
+# the exhaustive get_best_path against bidirectional Dijkstra, on the MIT
+# map and on synthetic grids, with no outdoor limit.
+
+import random
+import time
+
+from graph import Digraph, Node, WeightedEdge
+from ps2 import SearchStats, bidirectional_dijkstra, get_best_path, load_map
+
+
+def main():
+    # MIT map: a fixed sample of pairs of buildings (the exhaustive search
+    # takes too long to run on all of them)
+    graph = load_map("mit_map.txt")
+    names = sorted(node.get_name() for node in graph.nodes)
+    pairs = random.Random(0).sample([(start, end) for start in names for end in names
+                                     if start != end], 20)
+    compare_searches("mit_map.txt", graph, pairs)
+
+    # Grids: corner to corner (get_best_path only on the small ones)
+    for size in (4, 5, 6, 30, 100):
+        graph = make_grid_digraph(size, seed=size)
+        pairs = [("0,0", f"{size - 1},{size - 1}")]
+        compare_searches(f"{size}x{size} grid", graph, pairs, with_dfs=size <= 6)
+
+
+def make_grid_digraph(size, seed=None):
+    """
+    Creates a size x size grid of buildings named "row,column", with edges
+    both ways between neighbours. Total distances are random; half the
+    edges are outdoors all the way, the others are indoors.
+
+    Returns:
+    a Digraph
+    """
+    rng = random.Random(seed)
+    graph = Digraph()
+    nodes = {}
+    for row in range(size):
+        for column in range(size):
+            nodes[row, column] = Node(f"{row},{column}")
+            graph.add_node(nodes[row, column])
+
+    for (row, column), node in nodes.items():
+        for other in ((row + 1, column), (row, column + 1)):
+            if other in nodes:
+                for src, dest in ((node, nodes[other]), (nodes[other], node)):
+                    total = rng.randint(10, 100)
+                    graph.add_edge(WeightedEdge(src, dest, total, rng.choice((0, total))))
+
+    return graph
+
+
+def count_dfs_expansions(graph, start, end):
+    """
+    Runs get_best_path with no outdoor limit and counts its calls (one per
+    node expanded).
+
+    Returns:
+    a tuple (path, number of calls)
+    """
+    stats = SearchStats(start, end, float("inf"), float("inf"))
+    best_path, _ = get_best_path(graph, start, end, [[], 0, 0],
+                                 float("inf"), float("inf"), None, stats)
+    return best_path, stats.calls
+
+
+def compare_searches(title, graph, pairs, with_dfs=True):
+    """
+    Prints the total expansions and time of each search over the pairs of
+    (start, end) buildings.
+    """
+    print(f"{title} ({len(graph.nodes)} nodes, {len(pairs)} queries)")
+
+    if with_dfs:
+        expansions = 0
+        start_time = time.perf_counter()
+        for start, end in pairs:
+            expansions += count_dfs_expansions(graph, start, end)[1]
+        seconds = time.perf_counter() - start_time
+        print(f"    get_best_path:          {expansions:>10} expansions, {seconds:.3f} s")
+
+    stats = {}
+    start_time = time.perf_counter()
+    for start, end in pairs:
+        bidirectional_dijkstra(graph, start, end, stats)
+    seconds = time.perf_counter() - start_time
+    print(f"    bidirectional_dijkstra: {stats['expansions']:>10} expansions, {seconds:.3f} s")
+
+
+# Run 'main' function
+if __name__ == "__main__":
+    main()
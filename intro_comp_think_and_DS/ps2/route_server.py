@@ -0,0 +1,328 @@
+# Route query server: answers shortest-path queries on a campus map for
+# many clients at once, over a TCP or Unix socket.
+#
+# Protocol: one JSON object per line in each direction. A query is
+#     {"id": 1, "start": "32", "end": "56", "max_total_dist": 500, "max_dist_outdoors": 0}
+# ("id" is optional and sent back, both limits default to no limit) and is
+# answered with
+#     {"id": 1, "path": ["32", "36", "26", "16", "56"], "total_dist": 160,
+#      "outdoor_dist": 0, "latency_ms": 0.8}
+# or {"id": 1, "error": "...", "latency_ms": 0.1} when there is no path or the
+# query is wrong. {"stats": true} returns the number of queries answered and
+# the latency percentiles of the last ones.
+
+import argparse
+import asyncio
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import json
+import os
+import statistics
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from ps2 import label_setting_search, load_map_cached
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve shortest-path queries on a map")
+    parser.add_argument("--map", default="mit_map.txt", help="map file")
+    parser.add_argument("--snapshot", help="binary snapshot of the map (default: map file + .snapshot)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    asyncio.run(serve_forever(args.map, args.host, args.port, args.unix, args.workers, args.snapshot))
+
+
+async def serve_forever(map_filename, host, port, unix_path, workers, snapshot_filename=None):
+    server = RouteServer(map_filename, workers, snapshot_filename)
+    await server.start(host, port, unix_path)
+    print(f"Serving routes of {map_filename} on {unix_path or f'{host}:{server.port}'}")
+    try:
+        await server.server.serve_forever()
+    finally:
+        server.close()
+
+
+# ------------------------------------------------
+# Searches (run in the worker processes)
+# ------------------------------------------------
+# Graph of each worker process: a view of the memory-mapped snapshot, so
+# the workers share the same pages instead of holding a copy each
+worker_graph = None
+
+
+def init_worker(map_filename, snapshot_filename):
+    global worker_graph
+    worker_graph = load_map_cached(map_filename, snapshot_filename)
+
+
+def find_route(start, end, max_total_dist, max_dist_outdoors):
+    """
+    Searches worker_graph for the shortest route within both limits.
+
+    Returns:
+    a dictionary with the path and its distances, or with an error message
+    """
+    if not (worker_graph.has_node(start) and worker_graph.has_node(end)):
+        return {"error": "Non-existent node in the graph"}
+
+    result = label_setting_search(worker_graph, worker_graph.get_id(start), worker_graph.get_id(end),
+                                  max_total_dist, max_dist_outdoors)
+    if result is None:
+        return {"error": f"There is no path from {start} to {end}"}
+
+    path, total_dist, outdoor_dist = result
+    return {"path": [worker_graph.get_name(node) for node in path],
+            "total_dist": total_dist, "outdoor_dist": outdoor_dist}
+
+
+# ------------------------------------------------
+# Server
+# ------------------------------------------------
+class RouteServer(object):
+    """
+    Asyncio server answering route queries (see the top of this file). The
+    map is parsed once, into a binary snapshot (see load_map_cached) that
+    every worker process memory-maps and never changes; searches run in
+    the process pool so the event loop only reads and writes lines.
+    """
+    # Limit used when a query gives none
+    NO_LIMIT = 2 ** 31 - 1
+    # Number of recent queries the latency percentiles are computed over
+    LATENCY_WINDOW = 10000
+
+    def __init__(self, map_filename, workers=2, snapshot_filename=None):
+        self.map_filename = map_filename
+        self.snapshot_filename = snapshot_filename
+        self.workers = workers
+
+        # Build (or refresh) the snapshot here, before the workers map it
+        load_map_cached(map_filename, snapshot_filename)
+        self.pool = self.start_pool()
+        self.server = None
+        self.port = None
+        self.queries = 0                    # number of queries answered
+        # Seconds taken by the last queries (older ones are dropped)
+        self.latencies = deque(maxlen=self.LATENCY_WINDOW)
+
+    async def start(self, host="127.0.0.1", port=0, unix_path=None):
+        """
+        Starts listening on a Unix socket if unix_path is given, else on
+        host:port (port 0 picks a free port, stored in self.port).
+        """
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port)
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    def start_pool(self):
+        return ProcessPoolExecutor(self.workers, initializer=init_worker,
+                                   initargs=(self.map_filename, self.snapshot_filename))
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.pool.shutdown(cancel_futures=True)
+
+    async def handle_client(self, reader, writer):
+        # Answer the queries of one client, in order, until it disconnects
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than the reader's limit: the rest of it
+                    # cannot be told apart from the next query, so give up
+                    writer.write(json.dumps({"error": "Bad query: line too long"}).encode() + b"\n")
+                    await writer.drain()
+                    break
+                if not line:
+                    break
+                response = await self.answer(line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def answer(self, line):
+        """
+        Returns the response (a dictionary) to one line sent by a client.
+        """
+        start_time = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("A query must be a JSON object")
+        except ValueError as error:
+            return {"error": f"Bad query: {error}"}
+
+        if request.get("stats"):
+            return self.stats()
+
+        response = {"id": request.get("id")}
+        try:
+            start, end = str(request["start"]), str(request["end"])
+            max_total_dist = int(request.get("max_total_dist", self.NO_LIMIT))
+            max_dist_outdoors = int(request.get("max_dist_outdoors", self.NO_LIMIT))
+        except (KeyError, TypeError, ValueError) as error:
+            response["error"] = f"Bad query: {error!r}"
+        else:
+            loop = asyncio.get_running_loop()
+            pool = self.pool
+            try:
+                response.update(await loop.run_in_executor(
+                    pool, find_route, start, end, max_total_dist, max_dist_outdoors))
+            except BrokenProcessPool:
+                # A worker died: answer this query with an error and start
+                # a new pool for the next ones (once, if several fail)
+                response["error"] = "Search failed: worker process died"
+                if self.pool is pool:
+                    pool.shutdown(wait=False)
+                    self.pool = self.start_pool()
+
+        latency = time.perf_counter() - start_time
+        self.queries += 1
+        self.latencies.append(latency)
+        response["latency_ms"] = round(latency * 1000, 3)
+        return response
+
+    def stats(self):
+        """
+        Number of queries answered and the latency percentiles (ms) of the
+        last LATENCY_WINDOW of them.
+        """
+        stats = {"queries": self.queries}
+        if len(self.latencies) >= 2:
+            cuts = statistics.quantiles(self.latencies, n=100, method="inclusive")
+            stats["p50_ms"] = round(cuts[49] * 1000, 3)
+            stats["p95_ms"] = round(cuts[94] * 1000, 3)
+            stats["max_ms"] = round(max(self.latencies) * 1000, 3)
+        return stats
+
+
+# ================================================================
+# Tests (everything runs on localhost)
+# ================================================================
+async def send_queries(reader, writer, queries):
+    # Send queries on an open connection and return the responses
+    responses = []
+    for query in queries:
+        writer.write(json.dumps(query).encode() + b"\n")
+        await writer.drain()
+        responses.append(json.loads(await reader.readline()))
+    return responses
+
+
+class TestRouteServer(unittest.TestCase):
+    QUERIES = [
+        {"id": 1, "start": "32", "end": "56"},
+        {"id": 2, "start": "32", "end": "56", "max_dist_outdoors": 0},
+        {"id": 3, "start": "8", "end": "50", "max_total_dist": 100},
+        {"id": 4, "start": "32", "end": "nowhere"},
+    ]
+
+    def check_responses(self, responses):
+        self.assertEqual([response["id"] for response in responses], [1, 2, 3, 4])
+        self.assertEqual(responses[0]["path"], ["32", "56"])
+        self.assertEqual(responses[1]["path"], ["32", "36", "26", "16", "56"])
+        self.assertEqual(responses[1]["outdoor_dist"], 0)
+        self.assertIn("error", responses[2])
+        self.assertIn("error", responses[3])
+        for response in responses:
+            self.assertGreaterEqual(response["latency_ms"], 0)
+
+    def setUp(self):
+        # Keep the snapshot out of the source directory
+        self.directory = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.directory.name, "mit_map.snapshot")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_tcp_many_clients(self):
+        async def run():
+            # Small latency window: stats still count every query
+            with mock.patch.object(RouteServer, "LATENCY_WINDOW", 8):
+                server = RouteServer("mit_map.txt", workers=2, snapshot_filename=self.snapshot)
+            await server.start()
+            try:
+                connections = [await asyncio.open_connection("127.0.0.1", server.port)
+                               for _ in range(5)]
+                results = await asyncio.gather(*(send_queries(reader, writer, self.QUERIES)
+                                                 for reader, writer in connections))
+                stats, bad = await send_queries(*connections[0], [{"stats": True}, [1, 2]])
+                for _, writer in connections:
+                    writer.close()
+            finally:
+                server.close()
+            self.assertEqual(len(server.latencies), 8)
+            return results, stats, bad
+
+        results, stats, bad = asyncio.run(run())
+        for responses in results:
+            self.check_responses(responses)
+        self.assertEqual(stats["queries"], 5 * len(self.QUERIES))
+        self.assertIn("p95_ms", stats)
+        self.assertIn("error", bad)
+
+    @unittest.skipUnless(hasattr(asyncio, "start_unix_server"), "no Unix sockets")
+    def test_unix_socket(self):
+        async def run(path):
+            server = RouteServer("mit_map.txt", workers=1, snapshot_filename=self.snapshot)
+            await server.start(unix_path=path)
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                responses = await send_queries(reader, writer, self.QUERIES)
+                writer.close()
+            finally:
+                server.close()
+            return responses
+
+        with tempfile.TemporaryDirectory() as directory:
+            self.check_responses(asyncio.run(run(os.path.join(directory, "routes.sock"))))
+
+    def test_errors_are_answered(self):
+        async def run():
+            server = RouteServer("mit_map.txt", workers=1, snapshot_filename=self.snapshot)
+            await server.start()
+            try:
+                # A worker dying fails one query, then the pool is replaced
+                await asyncio.get_running_loop().run_in_executor(server.pool, os._exit, 1)
+            except BrokenProcessPool:
+                pass
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+                broken, working = await send_queries(reader, writer, self.QUERIES[:2])
+
+                # A line over the reader limit (64 KiB) gets an error too
+                writer.write(b"x" * 100000 + b"\n")
+                await writer.drain()
+                too_long = json.loads(await reader.readline())
+                writer.close()
+            finally:
+                server.close()
+            return broken, working, too_long
+
+        broken, working, too_long = asyncio.run(run())
+        self.assertIn("error", broken)
+        self.assertEqual(working["path"], ["32", "36", "26", "16", "56"])
+        self.assertIn("error", too_long)
+
+
+# Run 'main' function
+if __name__ == "__main__":
+    main()